@@ -1,642 +1,643 @@
-from flask import Flask, render_template, request, jsonify, render_template_string
-import pandas as pd
-import numpy as np
-import pickle
+from flask import Flask, Response, g, got_request_exception, render_template, request, jsonify
+from jinja2 import FileSystemBytecodeCache
+import hmac
+import io
+import json
 import os
 import logging
+import random
+import tempfile
+import time
+import warnings
+
+from batching import MicroBatcher
+from bundle import INFERENCE_THREADS, PARALLEL_MIN_ROWS, BundleHolder
+from cache import PredictionCache, SharedPredictionCache, TieredCache, row_key
+from capture import RequestCapture
+from pages import StaticPage
+from profiling import RequestProfiles, SamplingProfiler
+from timing import NULL_TIMER, StageHistograms, StageTimer
+from warmup import WARMUP_ENVIRON_KEY, WarmUp, sample_records
+import assets
+import bulk
+import metrics
 
 app = Flask(__name__)
 
+# Optional on-disk cache of compiled template bytecode, reused across restarts
+TEMPLATE_CACHE_DIR = os.getenv('TEMPLATE_CACHE_DIR')
+if TEMPLATE_CACHE_DIR:
+    os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+    app.jinja_options = dict(app.jinja_options, bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR))
+
+# Fingerprinted, immutable URLs for static/ with Range support (asset_url() in templates).
+# It touches app.jinja_env, which freezes jinja_options, so it comes after them
+assets.init_app(app)
+
+# Compile every page template once at startup; Jinja keeps the compiled templates
+for template_name in ('home.html', 'predict_form.html', 'result.html'):
+    app.jinja_env.get_template(template_name)
+
+# Pages that don't depend on request data, rendered once per application root and
+# kept in memory pre-compressed
+_static_pages = {}
+
+def render_static_page(template_name):
+    key = (template_name, request.script_root)
+    page = _static_pages.get(key)
+    if page is None:
+        page = _static_pages[key] = StaticPage(render_template(template_name).encode())
+    return page.response(request)
+
+# Pre-render them for the root mount so the first visitors don't pay for it
+with app.test_request_context('/'):
+    for template_name in ('home.html', 'predict_form.html'):
+        render_static_page(template_name)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
-# Load the trained model, feature names, and LabelEncoders from a single pickle file
-def load_model_and_features():
-    model_path = os.getenv('MODEL_PATH', 'combined_model.pkl')
-    
-    try:
-        with open(model_path, 'rb') as file:
-            combined_data = pickle.load(file)
-        
-        # Extract components from the combined data
-        model = combined_data.get('model')
-        feature_names = combined_data.get('feature_names')
-        label_encoders = combined_data.get('label_encoders')
-        
-        if model is None or feature_names is None or label_encoders is None:
-            raise ValueError("One or more components (model, feature_names, label_encoders) are missing in the pickle file.")
-        
-        logging.info("Model, feature names, and LabelEncoders loaded successfully!")
-        return model, feature_names, label_encoders
-    except Exception as e:
-        logging.error(f"Error loading model, feature names, or LabelEncoders: {str(e)}")
-        return None, None, None
-
-# Initialize the model, feature names, and LabelEncoders
-model, feature_names, label_encoders = load_model_and_features()
+# The encoder hands the model plain NumPy rows; models fitted on a DataFrame warn
+# about the missing column names on every call otherwise
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+# The model is a pickle file (model, feature names and LabelEncoders) or a portable
+# artifact directory written by `python artifact.py export`. MODEL_GENERATION_FILE
+# (gunicorn.conf.py sets one per master) makes /admin/reload reach every worker
+bundles = BundleHolder(os.getenv('MODEL_PATH', 'combined_model.pkl'), os.getenv('MODEL_GENERATION_FILE'))
+
+try:
+    bundles.reload()
+except Exception as e:
+    logging.error(f"Error loading model, feature names, or LabelEncoders: {str(e)}")
+
+# Poll MODEL_PATH and swap in retrained models without restarting workers
+MODEL_WATCH_INTERVAL = float(os.getenv('MODEL_WATCH_INTERVAL', '0'))
+
+# How often workers check MODEL_GENERATION_FILE for reloads requested through /admin/reload
+MODEL_RELOAD_POLL_INTERVAL = float(os.getenv('MODEL_RELOAD_POLL_INTERVAL', '1'))
+
+# Optional micro-batching of concurrent single predictions; off unless a wait is set
+MICROBATCH_MAX_WAIT_MS = float(os.getenv('MICROBATCH_MAX_WAIT_MS', '0'))
+MICROBATCH_MAX_SIZE = int(os.getenv('MICROBATCH_MAX_SIZE', '64'))
+batcher = MicroBatcher(MICROBATCH_MAX_SIZE, MICROBATCH_MAX_WAIT_MS) if MICROBATCH_MAX_WAIT_MS > 0 else None
+
+# Optional LRU cache of predictions keyed on model version and encoded features
+PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', '0'))
+PREDICTION_CACHE_TTL = float(os.getenv('PREDICTION_CACHE_TTL', '0'))
+cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL) if PREDICTION_CACHE_SIZE > 0 else None
+
+# Optional node-wide tier shared by all gunicorn workers, e.g. /dev/shm/carzz-cache.sqlite
+SHARED_CACHE_PATH = os.getenv('SHARED_CACHE_PATH')
+SHARED_CACHE_SIZE = int(os.getenv('SHARED_CACHE_SIZE', '100000'))
+if SHARED_CACHE_PATH:
+    shared_cache = SharedPredictionCache(SHARED_CACHE_PATH, SHARED_CACHE_SIZE, PREDICTION_CACHE_TTL)
+    cache = TieredCache(cache, shared_cache) if cache is not None else shared_cache
+
+def is_warm_up():
+    # Warm-up requests (warmup.py) are kept out of the stats and metrics
+    return bool(request.environ.get(WARMUP_ENVIRON_KEY))
+
+# Optional per-stage timing of the predict endpoints, reported in a Server-Timing
+# header and in /api/stats; when off, the stages are marked on a shared no-op timer
+STAGE_TIMING = os.getenv('STAGE_TIMING', '0') == '1'
+stage_histograms = StageHistograms() if STAGE_TIMING else None
+
+def start_timer():
+    if stage_histograms is None:
+        return NULL_TIMER
+    timer = g.stage_timer = StageTimer()
+    return timer
+
+if STAGE_TIMING:
+    @app.after_request
+    def add_server_timing(response):
+        timer = g.pop('stage_timer', None)
+        if timer is not None and not is_warm_up():
+            # Whatever ran since the last mark built the response (template, JSON)
+            timer.mark('render')
+            response.headers['Server-Timing'] = timer.header()
+            stage_histograms.record(request.endpoint, timer)
+        return response
+
+# Request metrics for /metrics; warm-up requests are left out, so a preloaded
+# master never reports itself as serving
+_reported_bundle = None
+
+@app.before_request
+def start_request_clock():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    global _reported_bundle
+    started = g.pop('request_started', None)
+    if started is not None and not is_warm_up():
+        metrics.observe_request(request.endpoint, request.method, response.status_code,
+                                time.perf_counter() - started)
+        bundle = bundles.current
+        if bundle is not _reported_bundle:
+            metrics.set_model(bundle, _reported_bundle)
+            _reported_bundle = bundle
+    return response
+
+def count_unhandled_error(sender, exception, **extra):
+    metrics.count_error(request.endpoint, exception)
+
+got_request_exception.connect(count_unhandled_error, app)
+
+# On-demand profiling of /predict and /api/predict (see profiling.py): requests with
+# a valid signed X-Profile header, or the next requests after POST /admin/profile
+PROFILE_SECRET = os.getenv('PROFILE_SECRET')
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'carprice-profiles'))
+request_profiles = RequestProfiles(PROFILE_DIR, PROFILE_SECRET)
+
+# Continuous low-rate stack sampling of the requests in flight, merged across the
+# node's workers at /admin/sampling; SAMPLING_HZ=0 turns it off
+SAMPLING_HZ = float(os.getenv('SAMPLING_HZ', '20'))
+SAMPLING_WINDOW = float(os.getenv('SAMPLING_WINDOW', '300'))
+sampler = SamplingProfiler(PROFILE_DIR, SAMPLING_HZ, SAMPLING_WINDOW) if SAMPLING_HZ > 0 else None
+
+if sampler is not None:
+    @app.before_request
+    def start_sampling_request():
+        if not is_warm_up():
+            sampler.enter(request.endpoint)
+
+    @app.teardown_request
+    def stop_sampling_request(exception):
+        sampler.leave()
+
+# Opt-in capture of /predict and /api/predict traffic as JSON lines for replay and
+# benchmarking (see capture.py); a writer thread does all the disk I/O
+CAPTURE_DIR = os.getenv('CAPTURE_DIR')
+CAPTURE_SAMPLE = float(os.getenv('CAPTURE_SAMPLE', '1'))
+capture = RequestCapture(
+    CAPTURE_DIR,
+    max_bytes=int(os.getenv('CAPTURE_MAX_MB', '64')) << 20,
+    max_seconds=float(os.getenv('CAPTURE_ROTATE_SECONDS', '3600')),
+    compress=os.getenv('CAPTURE_COMPRESS', '1') == '1',
+    queue_size=int(os.getenv('CAPTURE_QUEUE_SIZE', '10000')),
+    on_drop=metrics.CAPTURE_DROPPED.inc
+) if CAPTURE_DIR else None
+
+def capture_request(bundle, records, predictions):
+    """Queue one request's inputs and predictions for the capture writer."""
+    if capture is None or is_warm_up() or (CAPTURE_SAMPLE < 1 and random.random() >= CAPTURE_SAMPLE):
+        return
+    started = g.get('request_started')
+    capture.submit({
+        'ts': round(time.time(), 3),
+        'endpoint': request.endpoint,
+        'input': records,
+        'prediction': predictions,
+        'model_version': bundle.version,
+        'latency_ms': round((time.perf_counter() - started) * 1e3, 3) if started is not None else None
+    }, bundle.encoder.feature_names)
+
+def start_background_threads():
+    """Start the per-process helper threads.
+
+    Threads don't survive fork, so with preload_app gunicorn calls this again in
+    every worker (see gunicorn.conf.py).
+    """
+    intervals = [MODEL_WATCH_INTERVAL] if MODEL_WATCH_INTERVAL > 0 else []
+    if bundles.generation_path:
+        intervals.append(MODEL_RELOAD_POLL_INTERVAL)
+    if intervals:
+        bundles.watch(min(intervals), watch_path=MODEL_WATCH_INTERVAL > 0)
+    if batcher is not None:
+        batcher.start()
+    if sampler is not None:
+        sampler.start()
+    if capture is not None:
+        capture.start()
+
+# gunicorn.conf.py preloads the app in a master that never serves requests; it
+# starts the threads in each worker's post_fork instead
+if os.getenv('START_THREADS_IN_POST_FORK') != '1':
+    start_background_threads()
+
+def predict_one(bundle, record, timer=NULL_TIMER):
+    """Encode and score a single record, through the cache and micro-batcher when enabled."""
+    X = bundle.encoder.encode(record)
+    timer.mark('encode')
+
+    # Warm-up requests would fill the cache and its hit/miss counters with sample rows
+    use_cache = cache is not None and not is_warm_up()
+    if use_cache:
+        key = row_key(X[0])
+        price = cache.get(bundle.version, key)
+        timer.mark('cache')
+        metrics.count_cache_lookups(price is not None, price is None)
+        if price is not None:
+            return price
+
+    # Not running in a preloaded master, which still warms up
+    if batcher is not None and batcher.running:
+        price = batcher.predict(bundle, X[0])
+    else:
+        price = float(bundle.predict(X)[0])
+    timer.mark('predict')
+
+    if use_cache:
+        cache.put(bundle.version, key, price)
+        timer.mark('cache')
+    return price
+
+# Representative requests sent through /api/predict before a process reports ready
+WARMUP_REQUESTS = int(os.getenv('WARMUP_REQUESTS', '64'))
+WARMUP_DATA = os.getenv('WARMUP_DATA', os.path.join(app.root_path, 'Data_Train.csv'))
+try:
+    warm_up = WarmUp(app, sample_records(WARMUP_DATA, WARMUP_REQUESTS))
+except OSError as e:
+    logging.error(f"Error reading warm-up data: {str(e)}")
+    warm_up = WarmUp(app, [])
+
+# A newly installed model is warmed up again before readiness reflects it, which
+# also lets a worker that started without a model become ready after a reload
+bundles.on_install = lambda bundle: warm_up.run()
+
+# Shared secret for the /admin endpoints; they are disabled when unset
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
+def is_admin_request():
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
 
 @app.route('/', methods=['GET'])
 def home():
-    return render_template_string('''
-    <!DOCTYPE html>
-    <html lang="en">
-      <head>
-        <meta charset="UTF-8" />
-        <meta name="viewport" content="width=device-width, initial-scale=1.0" />
-        <title>Car Rental Landing Page</title>
-        <style>
-          /* Reset */
-          * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-          }
-
-          body {
-            font-family: 'Arial', sans-serif;
-            color: #000;
-            line-height: 1.6;
-            background-color: #fff;
-            position: relative;
-            overflow-x: hidden;
-            min-height: 100vh;
-            display: flex;
-            flex-direction: column;
-          }
-
-          /* Full-screen background video */
-          .background-video {
-            position: fixed;
-            top: 0;
-            left: 0;
-            width: 100%;
-            height: 100%;
-            object-fit: cover;
-            z-index: -1;
-          }
-
-          /* Header */
-          .header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            padding: 20px 40px;
-            background-color: rgba(255, 255, 255, 0.8);
-            z-index: 1;
-            width: 100%;
-          }
-
-          .logo {
-            font-size: 1.5rem;
-            font-weight: bold;
-          }
-
-          .nav ul {
-            display: flex;
-            list-style: none;
-          }
-
-          .nav ul li {
-            margin: 0 15px;
-          }
-
-          .nav ul li a {
-            text-decoration: none;
-            color: #000;
-            font-size: 1rem;
-          }
-
-          .download-btn a {
-            text-decoration: none;
-            background-color: #000;
-            color: #fff;
-            padding: 10px 20px;
-            border-radius: 5px;
-            font-size: 0.9rem;
-          }
-
-          /* Main Section */
-          .main {
-            flex: 1;
-            display: flex;
-            flex-direction: column;
-            justify-content: center;
-            align-items: center;
-            padding: 40px 80px;
-            text-align: center;
-            color: #fff;
-            z-index: 1;
-            background-color: rgba(0, 0, 0, 0.5);
-          }
-
-          .content h1 {
-            font-size: 3rem;
-            font-weight: bold;
-            margin-bottom: 20px;
-          }
-
-          .content p {
-            font-size: 1.2rem;
-            color: #ddd;
-          }
-
-          /* Footer */
-          .footer {
-            background-color: #222;
-            color: #fff;
-            padding: 20px 10px;
-            z-index: 1;
-            position: relative;
-            width: 100%;
-            font-size: 0.8rem;
-          }
-
-          .footer-columns {
-            display: flex;
-            flex-wrap: wrap;
-            justify-content: space-between;
-            margin-bottom: 10px;
-          }
-
-          .footer-column {
-            flex: 1;
-            margin: 5px;
-            min-width: 150px;
-          }
-
-          .footer-column h4 {
-            margin-bottom: 5px;
-            font-size: 1rem;
-          }
-
-          .footer-column ul {
-            list-style: none;
-            padding: 0;
-          }
-
-          .footer-column ul li {
-            margin: 3px 0;
-          }
-
-          .footer-column ul li a {
-            text-decoration: none;
-            color: #aaa;
-            font-size: 0.8rem;
-          }
-
-          .footer-column ul li a:hover {
-            color: #fff;
-          }
-
-          .social-icons {
-            display: flex;
-            gap: 10px;
-          }
-
-          .social-icons a {
-            text-decoration: none;
-            color: #fff;
-            font-size: 1rem;
-          }
-
-          .footer-bottom {
-            text-align: center;
-            font-size: 0.7rem;
-            color: #aaa;
-          }
-        </style>
-      </head>
-      <body>
-        <video class="background-video" autoplay muted loop>
-          <source src="{{ url_for('static', filename='landing_video.mp4') }}" type="video/mp4">
-          Your browser does not support the video tag.
-        </video>
-
-        <header class="header">
-          <div class="logo">
-            <span>🚗 CARZZ</span>
-          </div>
-          <nav class="nav">
-            <ul>
-              <li><a href="#">Your Trust, Our Guarantee</a></li>
-            </ul>
-          </nav>
-          <div class="download-btn">
-            <a href="/pre">Predict Your Car's True Value Instantly</a>
-          </div>
-        </header>
-
-        <main class="main">
-          <div class="content">
-            <h1>Accurate Car Price Estimates in Seconds</h1>
-            <p>
-              Welcome to our Car Price Prediction tool, where accuracy meets
-              simplicity! Whether you’re planning to sell your car or simply curious
-              about its market value, our advanced prediction model is here to help.
-            </p>
-          </div>
-        </main>
-
-        <footer class="footer">
-          <div class="footer-columns">
-            <div class="footer-column">
-              <h4>Quick Links</h4>
-              <ul>
-                <li><a href="/about-us">About Us</a></li>
-                <li><a href="/services">Services</a></li>
-                <li><a href="/faq">FAQ</a></li>
-              </ul>
-            </div>
-            <div class="footer-column">
-              <h4>Contact Us</h4>
-              <ul>
-                <li>Phone: +1-800-555-1234</li>
-                <li>Email: support@carzz.com</li>
-                <li>Address: 123 Main Street, City, State</li>
-              </ul>
-            </div>
-            <div class="footer-column">
-              <h4>Follow Us</h4>
-              <div class="social-icons">
-                <a href="https://facebook.com" target="_blank">📘</a>
-                <a href="https://twitter.com" target="_blank">🐦</a>
-                <a href="https://instagram.com" target="_blank">📸</a>
-                <a href="https://linkedin.com" target="_blank">🔗</a>
-              </div>
-            </div>
-          </div>
-          <div class="footer-bottom">
-            <p>&copy; 2024 CARZZ. All Rights Reserved. | <a href="/privacy-policy">Privacy Policy</a> | <a href="/terms-of-service">Terms of Service</a></p>
-          </div>
-        </footer>
-      </body>
-    </html>
-    ''')
+    return render_static_page('home.html')
 
 @app.route('/pre', methods=['GET'])
 def renderPredictPage():
-    return '''
-    <html>
-    <head>
-        <title>Car Price Prediction</title>
-        <style>
-            @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@400;500;600&display=swap');
-
-            body {
-                background: linear-gradient(135deg, #1a1a1a, #333);
-                color: white;
-                font-family: 'Poppins', sans-serif;
-                margin: 0;
-                min-height: 100vh;
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                padding: 40px 20px;
-            }
-
-            .container {
-                width: 100%;
-                max-width: 800px;
-            }
-
-            h1 {
-                text-align: center;
-                font-size: 2.5em;
-                margin-bottom: 30px;
-                font-weight: 600;
-            }
-
-            form {
-                background: rgba(255, 255, 255, 0.1);
-                padding: 30px;
-                border-radius: 15px;
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-                gap: 20px;
-                backdrop-filter: blur(10px);
-                box-shadow: 0 8px 32px 0 rgba(31, 38, 135, 0.37);
-                border: 1px solid rgba(255, 255, 255, 0.18);
-            }
-
-            .form-group {
-                margin-bottom: 15px;
-            }
-
-            label {
-                display: block;
-                margin-bottom: 8px;
-                font-weight: 500;
-                letter-spacing: 0.5px;
-            }
-
-            input, select {
-                width: 100%;
-                padding: 12px;
-                border: none;
-                border-radius: 8px;
-                background: rgba(255, 255, 255, 0.9);
-                color: #333;
-                font-size: 16px;
-                transition: all 0.3s ease;
-            }
-
-            input:focus, select:focus {
-                outline: none;
-                background: white;
-            }
-
-            .button-container {
-                grid-column: 1 / -1;
-                text-align: center;
-                margin-top: 20px;
-            }
-
-            button {
-                padding: 15px 40px;
-                background: rgba(255, 255, 255, 0.2);
-                color: white;
-                border: none;
-                border-radius: 30px;
-                font-size: 18px;
-                font-weight: 500;
-                letter-spacing: 1px;
-                cursor: pointer;
-                transition: all 0.3s ease;
-                backdrop-filter: blur(5px);
-                border: 1px solid rgba(255, 255, 255, 0.1);
-                box-shadow: 0 4px 15px rgba(0, 0, 0, 0.1);
-            }
-
-            button:hover {
-                background: rgba(255, 255, 255, 0.3);
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>Car Price Prediction System</h1>
-            <form action="/predict" method="post">
-                <div class="form-group">
-                    <label>Year:</label>
-                    <input type="number" name="year" required placeholder="Enter the year of manufacture">
-                </div>
-                <div class="form-group">
-                    <label>Kilometers Driven:</label>
-                    <input type="number" name="kilometers" required placeholder="Enter kilometers driven">
-                </div>
-                <div class="form-group">
-                    <label>Engine (cc):</label>
-                    <input type="number" name="engine" required placeholder="Enter engine capacity">
-                </div>
-                <div class="form-group">
-                    <label>Power (bhp):</label>
-                    <input type="number" step="0.1" name="power" required placeholder="Enter power">
-                </div>
-                <div class="form-group">
-                    <label>Seats:</label>
-                    <input type="number" name="seats" required placeholder="Enter number of seats">
-                </div>
-                <div class="form-group">
-                    <label>Location:</label>
-                    <select name="location" required>
-                        <option value="" disabled selected>Select location</option>
-                        <option value="Ahmedabad">Ahmedabad</option>
-                        <option value="Bangalore">Bengaluru</option>
-                        <option value="Chennai">Chennai</option>
-                        <option value="Coimbatore">Coimbatore</option>
-                        <option value="Delhi">Delhi</option>
-                        <option value="Hyderabad">Hyderabad</option>
-                        <option value="Jaipur">Jaipur</option>
-                        <option value="Kochi">Kochi</option>
-                        <option value="Kolkata">Kolkata</option>
-                        <option value="Mumbai">Mumbai</option>
-                        <option value="Pune">Pune</option>
-                    </select>
-                </div>
-                <div class="form-group">
-                    <label>Fuel Type:</label>
-                    <select name="fuel_type" required>
-                        <option value="" disabled selected>Select fuel type</option>
-                        <option value="CNG">CNG</option>
-                        <option value="Diesel">Diesel</option>
-                        <option value="Electric">Electric</option>
-                        <option value="LPG">LPG</option>
-                        <option value="Petrol">Petrol</option>
-                    </select>
-                </div>
-                <div class="form-group">
-                    <label>Transmission:</label>
-                    <select name="transmission" required>
-                        <option value="" disabled selected>Select transmission</option>
-                        <option value="Automatic">Automatic</option>
-                        <option value="Manual">Manual</option>
-                    </select>
-                </div>
-                <div class="form-group">
-                    <label>Owner Type:</label>
-                    <select name="owner_type" required>
-                        <option value="" disabled selected>Select owner type</option>
-                        <option value="First">First</option>
-                        <option value="Second">Second</option>
-                        <option value="Third">Third</option>
-                        <option value="Fourth & Above">Fourth & Above</option>
-                    </select>
-                </div>
-                <div class="button-container">
-                    <button type="submit">Predict Price</button>
-                </div>
-            </form>
-        </div>
-    </body>
-    </html>
-    '''
+    return render_static_page('predict_form.html')
+
+FORM_CATEGORICAL_FIELDS = {
+    'location': 'Location',
+    'fuel_type': 'Fuel_Type',
+    'transmission': 'Transmission',
+    'owner_type': 'Owner_Type'
+}
 
 @app.route('/predict', methods=['POST'])
 def predict():
-    if model is None or feature_names is None or label_encoders is None:
+    timer = start_timer()
+    bundle = bundles.current
+    if bundle is None:
         return jsonify({'error': 'Model, feature names, or LabelEncoders not loaded'}), 500
 
     try:
-        input_df = pd.DataFrame(0, index=[0], columns=feature_names)
-        
-        # Fill in numerical features
-        input_df['Year'] = int(request.form['year'])
-        input_df['Kilometers_Driven'] = float(request.form['kilometers'])
-        input_df['Engine'] = float(request.form['engine'])
-        input_df['Power'] = float(request.form['power'])
-        input_df['Seats'] = int(request.form['seats'])
-        input_df['Car_Age'] = 2024 - int(request.form['year'])  # Derived feature
-        
-        # Encode categorical features using LabelEncoders
-        for feature, encoder in label_encoders.items():
-            if feature in request.form:
-                input_df[feature] = encoder.transform([request.form[feature]])[0]
+        record = {
+            'Year': request.form['year'],
+            'Kilometers_Driven': request.form['kilometers'],
+            'Engine': request.form['engine'],
+            'Power': request.form['power'],
+            'Seats': request.form['seats'],
+            'Car_Age': 2024 - int(request.form['year'])  # Derived feature
+        }
+
+        # The form uses lowercase field names for the categorical features
+        for field, feature in FORM_CATEGORICAL_FIELDS.items():
+            if field in request.form:
+                record[feature] = request.form[field]
+        timer.mark('parse')
         
         # Use the model for prediction
-        prediction = model.predict(input_df)
+        prediction = predict_one(bundle, record, timer)
+        capture_request(bundle, record, prediction)
         
-        return render_template_string('''
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Prediction Result</title>
-                <style>
-                    @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@400;500;600&display=swap');
-
-                    body {
-                        margin: 0;
-                        min-height: 100vh;
-                        display: flex;
-                        flex-direction: column;
-                        align-items: center;
-                        justify-content: center;
-                        color: white;
-                        font-family: 'Poppins', sans-serif;
-                        overflow: hidden;
-                    }
-
-                    video {
-                        position: fixed;
-                        top: 0;
-                        left: 0;
-                        width: 100%;
-                        height: 100%;
-                        object-fit: cover;
-                        z-index: -1;
-                    }
-
-                    .container {
-                        text-align: center;
-                        padding: 20px;
-                        background: rgba(0, 0, 0, 0.7);
-                        border-radius: 15px;
-                        margin: 20px;
-                    }
-
-                    h1 {
-                        font-size: 2.5em;
-                        margin-bottom: 30px;
-                        font-weight: 600;
-                    }
-
-                    .result {
-                        background: rgba(255, 255, 255, 0.1);
-                        padding: 30px 50px;
-                        border-radius: 15px;
-                        margin: 20px 0;
-                        backdrop-filter: blur(10px);
-                        box-shadow: 0 8px 32px 0 rgba(31, 38, 135, 0.37);
-                        border: 1px solid rgba(255, 255, 255, 0.18);
-                    }
-
-                    .price {
-                        font-size: 2.8em;
-                        font-weight: bold;
-                        margin: 10px 0;
-                    }
-
-                    .back-button {
-                        margin-top: 30px;
-                    }
-
-                    .back-button a {
-                        display: inline-block;
-                        padding: 15px 30px;
-                        background: rgba(255, 255, 255, 0.2);
-                        color: white;
-                        text-decoration: none;
-                        border-radius: 30px;
-                        font-weight: 500;
-                        letter-spacing: 1px;
-                        transition: all 0.3s ease;
-                        backdrop-filter: blur(5px);
-                        border: 1px solid rgba(255, 255, 255, 0.1);
-                        box-shadow: 0 4px 15px rgba(0, 0, 0, 0.1);
-                    }
-
-                    .back-button a:hover {
-                        background: rgba(255, 255, 255, 0.3);
-                    }
-
-                    .currency-symbol {
-                        font-size: 0.7em;
-                        vertical-align: super;
-                    }
-
-                    .unit {
-                        font-size: 0.5em;
-                        opacity: 0.8;
-                        margin-left: 5px;
-                    }
-                </style>
-            </head>
-            <body>
-                <video autoplay muted loop>
-                    <source src="{{ url_for('static', filename='result_background.mp4') }}" type="video/mp4">
-                    Your browser does not support the video tag.
-                </video>
-                <div class="container">
-                    <h1>Prediction Result</h1>
-                    <div class="result">
-                        <div class="price">
-                            <span class="currency-symbol">₹</span>
-                            {{ "{:,.2f}".format(prediction[0]) }}Lakhs
-                        </div>
-                    </div>
-                    <div class="back-button">
-                        <a href="/">Back to Prediction Form</a>
-                    </div>
-                </div>
-            </body>
-            </html>
-        ''', prediction=prediction)
+        return render_template('result.html', prediction=prediction)
         
     except Exception as e:
         logging.error(f"Error in prediction: {str(e)}")
+        metrics.count_error(request.endpoint, e)
         return jsonify({'error': str(e)}), 400
 
+# Upper bound on the number of records accepted by one batch request
+MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', '10000'))
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+def parse_batch_body():
+    """Return the records of a batch request, or None for a single JSON object.
+
+    A batch is either a JSON array of objects or an NDJSON body (one object per
+    line). NDJSON lines that fail to parse are kept as exceptions so they can be
+    reported against their row instead of failing the whole batch.
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        records = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                records.append(ValueError(f"Invalid JSON: {e}"))
+        return records
+
+    data = request.get_json()
+    return data if isinstance(data, list) else None
+
+def predict_batch(bundle, records, timer=NULL_TIMER):
+    """Score all valid records that miss the cache with a single prediction call.
+
+    Returns one result dict per record, in input order.
+    """
+    results = [None] * len(records)
+    matrix, positions, errors = bundle.encoder.encode_many(records)
+    timer.mark('encode')
+
+    for i, e in errors.items():
+        results[i] = {'index': i, 'error': str(e), 'status': 'error'}
+
+    if positions:
+        prices = [None] * len(positions)
+        use_cache = cache is not None and not is_warm_up()
+        if use_cache:
+            keys = [row_key(row) for row in matrix]
+            prices = [cache.get(bundle.version, key) for key in keys]
+            timer.mark('cache')
+            hits = sum(1 for price in prices if price is not None)
+            metrics.count_cache_lookups(hits, len(prices) - hits)
+
+        missing = [k for k, price in enumerate(prices) if price is None]
+        if missing:
+            predictions = bundle.predict(matrix if len(missing) == len(prices) else matrix[missing])
+            for k, price in zip(missing, predictions):
+                prices[k] = float(price)
+                if use_cache:
+                    cache.put(bundle.version, keys[k], prices[k])
+            timer.mark('predict')
+
+        for i, price in zip(positions, prices):
+            results[i] = {'index': i, 'predicted_price': price, 'status': 'success'}
+
+    return results
+
 @app.route('/api/predict', methods=['POST'])
 def api_predict():
-    if model is None or feature_names is None or label_encoders is None:
+    timer = start_timer()
+    bundle = bundles.current
+    if bundle is None:
         return jsonify({'error': 'Model, feature names, or LabelEncoders not loaded'}), 500
 
     try:
+        records = parse_batch_body()
+        timer.mark('parse')
+
+        if records is not None:
+            if len(records) > MAX_BATCH_SIZE:
+                return jsonify({
+                    'error': f'Batch of {len(records)} records exceeds the limit of {MAX_BATCH_SIZE}',
+                    'status': 'error'
+                }), 413
+
+            if not is_warm_up():
+                metrics.BATCH_SIZE.observe(len(records))
+            results = predict_batch(bundle, records, timer)
+            capture_request(bundle, records, [result.get('predicted_price') for result in results])
+            errors = sum(1 for result in results if result['status'] == 'error')
+            return jsonify({
+                'results': results,
+                'count': len(results),
+                'errors': errors,
+                'status': 'success'
+            })
+
         data = request.get_json()
-        
-        input_df = pd.DataFrame(0, index=[0], columns=feature_names)
-        
-        numerical_columns = {
-            'Year': int,
-            'Kilometers_Driven': float,
-            'Engine': float,
-            'Power': float,
-            'Seats': int,
-            'Car_Age': int
-        }
-        
-        for col, dtype in numerical_columns.items():
-            if col in data:
-                input_df[col] = dtype(data[col])
-        
-        # Encode categorical features using LabelEncoders
-        for feature, encoder in label_encoders.items():
-            if feature in data:
-                input_df[feature] = encoder.transform([data[feature]])[0]
-        
+
         # Use the model for prediction
-        prediction = model.predict(input_df)
+        prediction = predict_one(bundle, data, timer)
+        capture_request(bundle, data, prediction)
         
         return jsonify({
-            'predicted_price': float(prediction[0]),
+            'predicted_price': prediction,
             'status': 'success'
         })
         
     except Exception as e:
         logging.error(f"Error in API prediction: {str(e)}")
+        metrics.count_error(request.endpoint, e)
         return jsonify({
             'error': str(e),
             'status': 'error'
         }), 400
 
+# Rows of an uploaded inventory file scored per vectorized pass
+BULK_CHUNK_ROWS = int(os.getenv('BULK_CHUNK_ROWS', '1000'))
+
+@app.route('/api/predict/csv', methods=['POST'])
+def api_predict_csv():
+    """Score a Data_Test.csv-style upload, streaming results back chunk by chunk.
+
+    The body is the CSV itself (text/csv) or a multipart upload in the 'file'
+    field. The response is the input CSV with predicted_price and error columns
+    appended, or NDJSON results (one per row) with ?format=ndjson or an NDJSON
+    Accept header. Only one chunk of rows is in memory at a time.
+    """
+    bundle = bundles.current
+    if bundle is None:
+        return jsonify({'error': 'Model, feature names, or LabelEncoders not loaded'}), 500
+
+    upload = request.files.get('file')
+    if upload is not None:
+        # Flask closes the request's files when the view returns, before the body
+        # is streamed; the response takes the spooled upload over instead
+        stream, upload.stream = upload.stream, io.BytesIO()
+    else:
+        stream = request.stream
+
+    ndjson = request.args.get('format') == 'ndjson' or request.accept_mimetypes.best in NDJSON_MIMETYPES
+    # The body is generated after the request context is gone; it only needs these
+    endpoint = request.endpoint
+
+    # The first chunk is read and scored before any byte is sent, so a file that
+    # is broken from the start gets a proper error status
+    chunks = bulk.read_chunks(bulk.iter_lines(stream), BULK_CHUNK_ROWS)
+    try:
+        first = next(chunks, None)
+        if first is None:
+            raise ValueError('The CSV has no header or no rows')
+        first_result = bulk.score_rows(bundle, *first)
+    except Exception as e:
+        logging.error(f"Error in CSV prediction: {str(e)}")
+        metrics.count_error(endpoint, e)
+        if upload is not None:
+            stream.close()
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+
+    def generate():
+        header, rows = first
+        prices, errors = first_result
+        scored = 0
+        try:
+            while True:
+                if ndjson:
+                    yield bulk.ndjson_rows(scored, prices, errors)
+                else:
+                    yield (bulk.csv_header(header) if scored == 0 else '') + bulk.csv_rows(header, rows, prices, errors)
+                scored += len(rows)
+
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                header, rows = chunk
+                # Dealer files are mostly unique rows, so the prediction cache is skipped
+                prices, errors = bulk.score_rows(bundle, header, rows)
+        except Exception as e:
+            # The status line is already sent: mark the output as incomplete, then
+            # re-raise so the server drops the connection instead of ending it cleanly
+            logging.error(f"Error in CSV prediction after {scored} rows: {str(e)}")
+            metrics.count_error(endpoint, e)
+            message = f"Scoring stopped after {scored} rows: {e}"
+            if ndjson:
+                yield json.dumps({'error': message, 'rows': scored, 'status': 'error'}) + '\n'
+            else:
+                yield bulk.csv_trailer(header, message)
+            raise
+        finally:
+            if upload is not None:
+                stream.close()
+
+    mimetype = 'application/x-ndjson' if ndjson else 'text/csv'
+    return Response(generate(), mimetype=mimetype,
+                    headers={'X-Model-Version': bundle.version})
+
+@app.route('/api/model', methods=['GET'])
+def model_status():
+    return jsonify(bundles.status())
+
+@app.route('/api/stats', methods=['GET'])
+def serving_stats():
+    return jsonify({
+        'batcher': batcher.stats() if batcher is not None else None,
+        'cache': cache.stats() if cache is not None else None,
+        'stages': stage_histograms.stats() if stage_histograms is not None else None,
+        'capture': capture.stats() if capture is not None else None,
+        'parallelism': {'inference_threads': INFERENCE_THREADS, 'parallel_min_rows': PARALLEL_MIN_ROWS}
+    })
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden', 'status': 'error'}), 403
+
+    # The load runs in the background of every worker watching the generation file
+    # (of this process only without one); /api/model shows each worker's progress
+    try:
+        generation = bundles.request_reload()
+    except OSError as e:
+        logging.error(f"Error requesting model reload: {str(e)}")
+        metrics.count_error(request.endpoint, e)
+        return jsonify({'error': str(e), 'status': 'error'}), 500
+
+    return jsonify({
+        'generation': generation,
+        'scope': 'node' if generation is not None else 'process',
+        'pid': os.getpid(),
+        'status': 'accepted'
+    }), 202
+
+@app.route('/admin/profile', methods=['POST'])
+def admin_profile():
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden', 'status': 'error'}), 403
+
+    data = request.get_json(silent=True) or {}
+    try:
+        count = int(data.get('requests', 1))
+    except (TypeError, ValueError):
+        return jsonify({'error': "'requests' must be an integer", 'status': 'error'}), 400
+
+    # Only the worker that handles this request is armed
+    return jsonify({'armed': request_profiles.arm(count), 'pid': os.getpid(), 'status': 'success'})
+
+@app.route('/admin/profiles', methods=['GET'])
+def admin_profiles():
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden', 'status': 'error'}), 403
+    return jsonify({'profiles': request_profiles.list(), 'status': 'success'})
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+def admin_profile_stacks(profile_id):
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden', 'status': 'error'}), 403
+
+    stacks = request_profiles.read(profile_id)
+    if stacks is None:
+        return jsonify({'error': 'Profile not found', 'status': 'error'}), 404
+    return stacks, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
+@app.route('/admin/sampling', methods=['GET'])
+def admin_sampling():
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden', 'status': 'error'}), 403
+    if sampler is None:
+        return jsonify({'error': 'Sampling profiler is off (SAMPLING_HZ=0)', 'status': 'error'}), 404
+
+    endpoints, pids = sampler.collect()
+
+    # ?format=folded: collapsed stacks for flamegraphs, rooted at the endpoint
+    if request.args.get('format') == 'folded':
+        only = request.args.get('endpoint')
+        lines = [f"{endpoint};{stack} {n}"
+                 for endpoint, stacks in sorted(endpoints.items()) if only in (None, endpoint)
+                 for stack, n in sorted(stacks.items())]
+        return ''.join(line + '\n' for line in lines), 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
+    # Otherwise the share of samples per endpoint and its hottest leaf frames
+    summary = {}
+    for endpoint, stacks in endpoints.items():
+        total = sum(stacks.values())
+        leaves = {}
+        for stack, n in stacks.items():
+            leaf = stack.rsplit(';', 1)[-1]
+            leaves[leaf] = leaves.get(leaf, 0) + n
+        top = sorted(leaves.items(), key=lambda item: -item[1])[:10]
+        summary[endpoint] = {
+            'samples': total,
+            'top_frames': [{'frame': leaf, 'share': round(n / total, 4)} for leaf, n in top]
+        }
+
+    return jsonify({
+        'hz': SAMPLING_HZ,
+        'window_seconds': SAMPLING_WINDOW,
+        'workers': pids,
+        'endpoints': summary,
+        'status': 'success'
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    body, content_type = metrics.exposition()
+    return body, 200, {'Content-Type': content_type}
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    # Liveness only: the process is up and serving requests
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    bundle = bundles.current
+    ready = bundle is not None and warm_up.ready
+    return jsonify({
+        'status': 'ready' if ready else 'not ready',
+        'model': bundle.version if bundle is not None else None,
+        'warm_up': warm_up.status()
+    }), 200 if ready else 503
+
+# Profiling can only be requested with a secret, so without one the views stay
+# unwrapped and unprofiled requests don't even pay for the check
+if PROFILE_SECRET or ADMIN_TOKEN:
+    for endpoint in ('predict', 'api_predict'):
+        app.view_functions[endpoint] = request_profiles.wrap(app.view_functions[endpoint])
+
+# Routes are in place: warm this process up. Workers forked from a preloaded
+# master warm up again in post_fork (see gunicorn.conf.py)
+warm_up.run()
+
 if __name__ == '__main__':
     app.run(debug=True)
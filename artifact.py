@@ -0,0 +1,198 @@
+"""Portable model artifacts: raw .npy node arrays plus a JSON manifest.
+
+An artifact directory holds everything needed to serve predictions without
+unpickling sklearn objects:
+
+    manifest.json   format version, model version, features, encoder classes
+    feature.npy     split feature of every node
+    threshold.npy   split threshold of every node (inf for leaves)
+    child.npy       id of the first child of every node (itself for leaves)
+    value.npy       node values
+    roots.npy       root node id of every tree
+
+The arrays are opened with np.load(mmap_mode='r'), so gunicorn workers on the
+same machine share one copy through the OS page cache.
+
+The artifact path itself is a symlink to a versioned sibling directory
+(`<path>.<version>.<unique suffix>`), so a new export replaces it atomically.
+
+    python artifact.py export updated_model.pkl model_artifact
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from forest import TreeEnsemble
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+ARRAYS = ('feature', 'threshold', 'child', 'value', 'roots')
+
+Artifact = namedtuple('Artifact', [
+    'engine', 'feature_names', 'categories', 'numerical_cols', 'categorical_cols', 'version', 'manifest'
+])
+
+
+def read_pickle_bundle(path):
+    """Read a pickled model in any of the layouts used by this repo.
+
+    Returns (model, feature_names, label_encoders, numerical_cols, categorical_cols).
+    Both the combined layout ('model', 'feature_names', 'label_encoders') and the
+    updated_model.pkl layout ('model', 'encoders', 'numerical_cols',
+    'categorical_cols') are understood.
+    """
+    import pickle
+
+    with open(path, 'rb') as file:
+        combined_data = pickle.load(file)
+
+    model = combined_data.get('model')
+    feature_names = combined_data.get('feature_names')
+    label_encoders = combined_data.get('label_encoders', combined_data.get('encoders'))
+
+    # Bundles saved without an explicit feature list (e.g. updated_model.pkl)
+    # still carry the training columns on the fitted estimator
+    if feature_names is None and model is not None and hasattr(model, 'feature_names_in_'):
+        feature_names = list(model.feature_names_in_)
+
+    if model is None or feature_names is None or label_encoders is None:
+        raise ValueError("One or more components (model, feature_names, label_encoders) are missing in the pickle file.")
+
+    feature_names = [str(name) for name in feature_names]
+    categorical_cols = list(combined_data.get('categorical_cols') or label_encoders)
+    numerical_cols = list(combined_data.get('numerical_cols')
+                          or [name for name in feature_names if name not in categorical_cols])
+
+    return model, feature_names, label_encoders, numerical_cols, categorical_cols
+
+
+def is_artifact(path):
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def _version(metadata, arrays):
+    digest = hashlib.sha256(json.dumps(metadata, sort_keys=True).encode())
+    for name in ARRAYS:
+        digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def export_artifact(path, engine, feature_names, categories, numerical_cols, categorical_cols, source=None):
+    """Write a TreeEnsemble and its encoder metadata as the artifact `path`.
+
+    The files go into a new versioned sibling directory, and `path` is then
+    switched to it with a symlink os.replace()d over the old one, so `path`
+    always names a complete artifact, even while another process exports to
+    it. The previous directory is removed afterwards; processes that already
+    mapped its arrays keep them. Returns the version.
+    """
+    arrays = {name: getattr(engine, name) for name in ARRAYS}
+    metadata = {
+        'n_features': engine.n_features,
+        'depth': engine.depth,
+        'scale': engine.scale,
+        'offset': engine.offset,
+        'feature_names': list(feature_names),
+        'categories': {feature: [str(label) for label in classes] for feature, classes in categories.items()},
+        'numerical_cols': list(numerical_cols),
+        'categorical_cols': list(categorical_cols),
+    }
+    version = _version(metadata, arrays)
+    manifest = dict(
+        metadata,
+        format_version=FORMAT_VERSION,
+        version=version,
+        created_at=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        source=source,
+        arrays={name: {'dtype': str(array.dtype), 'shape': list(array.shape)} for name, array in arrays.items()},
+    )
+
+    path = os.path.abspath(path)
+    # Unique per export, so concurrent exporters never write into each other's directory
+    target = f"{path}.{version}.{os.getpid()}-{time.time_ns()}"
+    os.makedirs(target)
+    for name, array in arrays.items():
+        np.save(os.path.join(target, f"{name}.npy"), np.ascontiguousarray(array))
+    with open(os.path.join(target, MANIFEST), 'w') as file:
+        json.dump(manifest, file, indent=2)
+
+    previous = os.path.realpath(path) if os.path.islink(path) else None
+    if previous is None and os.path.isdir(path):
+        # A plain directory from an older export can't be replaced by a symlink
+        # in one step; it is moved aside first, leaving `path` missing briefly, once
+        previous = f"{target}.old"
+        os.rename(path, previous)
+
+    link = f"{target}.link"
+    os.symlink(os.path.basename(target), link)
+    os.replace(link, path)
+    if previous is not None:
+        shutil.rmtree(previous, ignore_errors=True)
+    return version
+
+
+def export_pickle(pickle_path, path):
+    """Convert a pickled model bundle into an artifact directory. Needs sklearn."""
+    model, feature_names, label_encoders, numerical_cols, categorical_cols = read_pickle_bundle(pickle_path)
+    engine = TreeEnsemble.from_sklearn(model)
+    categories = {feature: encoder.classes_.tolist() for feature, encoder in label_encoders.items()}
+    return export_artifact(path, engine, feature_names, categories, numerical_cols, categorical_cols,
+                           source=os.path.basename(pickle_path))
+
+
+def load_artifact(path):
+    """Open an artifact directory with its node arrays memory-mapped read-only."""
+    # Resolved once, so the manifest and arrays come from the same export
+    target = os.path.realpath(path)
+    try:
+        return _load_artifact(target)
+    except FileNotFoundError:
+        # A new export replaced the one being read and removed its directory
+        if os.path.realpath(path) == target:
+            raise
+        return _load_artifact(os.path.realpath(path))
+
+
+def _load_artifact(path):
+    with open(os.path.join(path, MANIFEST)) as file:
+        manifest = json.load(file)
+
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version: {manifest.get('format_version')}")
+
+    arrays = {}
+    for name, spec in manifest['arrays'].items():
+        array = np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+        if str(array.dtype) != spec['dtype'] or list(array.shape) != spec['shape']:
+            raise ValueError(f"Artifact array {name}.npy does not match the manifest")
+        # Plain ndarray views over the mapping; np.memmap adds overhead to every gather
+        arrays[name] = np.asarray(array)
+
+    engine = TreeEnsemble(
+        depth=manifest['depth'],
+        n_features=manifest['n_features'],
+        scale=manifest['scale'],
+        offset=manifest['offset'],
+        **arrays,
+    )
+    return Artifact(
+        engine=engine,
+        feature_names=manifest['feature_names'],
+        categories=manifest['categories'],
+        numerical_cols=manifest['numerical_cols'],
+        categorical_cols=manifest['categorical_cols'],
+        version=manifest['version'],
+        manifest=manifest,
+    )
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4 or sys.argv[1] != 'export':
+        sys.exit('usage: python artifact.py export MODEL.pkl ARTIFACT_DIR')
+    print(export_pickle(sys.argv[2], sys.argv[3]))
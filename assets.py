@@ -0,0 +1,178 @@
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import Blueprint, Response, abort, current_app, request, url_for
+from werkzeug.wsgi import wrap_file
+
+# Fingerprinted URLs change whenever the file does, so they can be cached forever
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# When set (e.g. '/protected-static/'), nginx serves the bytes via X-Accel-Redirect
+# and the worker only answers with headers
+ACCEL_REDIRECT_PREFIX = os.getenv('ASSET_ACCEL_REDIRECT_PREFIX')
+
+# Written by `python build_assets.py`; lets workers start without rehashing static/
+MANIFEST_NAME = 'manifest.json'
+
+bp = Blueprint('assets', __name__)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def fingerprint(name, digest):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest}{ext}"
+
+
+def scan(static_folder, previous=None):
+    """Describe every file under static_folder: {name: {hashed, digest, size, mtime_ns}}.
+
+    Entries from a previous scan are reused when the file's size and mtime still
+    match, so only new or changed files are hashed.
+    """
+    previous = previous or {}
+    entries = {}
+    for root, _, names in os.walk(static_folder):
+        for name in names:
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            if rel == MANIFEST_NAME:
+                continue
+            st = os.stat(path)
+            entry = previous.get(rel)
+            if entry is None or entry.get('size') != st.st_size or entry.get('mtime_ns') != st.st_mtime_ns:
+                digest = file_hash(path)
+                entry = {'hashed': fingerprint(rel, digest), 'digest': digest,
+                         'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+            entries[rel] = entry
+    return entries
+
+
+def read_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, MANIFEST_NAME)) as file:
+            return json.load(file).get('files', {})
+    except (OSError, ValueError):
+        return {}
+
+
+class AssetManifest:
+    """Maps static file names to content-hashed names and back."""
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.entries = scan(static_folder, read_manifest(static_folder))
+        self.hashed = {name: entry['hashed'] for name, entry in self.entries.items()}
+        self.files = {
+            entry['hashed']: (os.path.join(static_folder, name), entry['digest'])
+            for name, entry in self.entries.items()
+        }
+
+
+def asset_url(filename):
+    """URL of a static file under its fingerprinted name; falls back to /static."""
+    manifest = current_app.extensions['assets']
+    hashed_name = manifest.hashed.get(filename)
+    if hashed_name is None:
+        return url_for('static', filename=filename)
+    return url_for('assets.serve', filename=hashed_name)
+
+
+class _FileSlice:
+    """File-like view of `length` bytes from the current position of `file`.
+
+    It keeps fileno(), so gunicorn can still sendfile() it (from the current
+    offset, for Content-Length bytes); servers that iterate the body instead
+    stop at the end of the slice.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def asset_exists(filename):
+    return filename in current_app.extensions['assets'].hashed
+
+
+def _file_response(path, mimetype, start, length):
+    file = open(path, 'rb')
+    file.seek(start)
+    # wsgi.file_wrapper lets gunicorn hand the file to sendfile(2): the bytes go
+    # from the page cache to the socket without passing through Python
+    body = wrap_file(request.environ, _FileSlice(file, length))
+    response = Response(body, mimetype=mimetype, direct_passthrough=True)
+    response.content_length = length
+    return response
+
+
+@bp.route('/assets/<path:filename>', methods=['GET'])
+def serve(filename):
+    manifest = current_app.extensions['assets']
+    entry = manifest.files.get(filename)
+    if entry is None:
+        abort(404)
+    path, digest = entry
+
+    size = os.path.getsize(path)
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    if request.if_none_match.contains_weak(digest):
+        response = Response(status=304)
+    elif ACCEL_REDIRECT_PREFIX:
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + filename
+    else:
+        byte_range = request.range
+        # If-Range: only honour the range when the client still has this version;
+        # we don't send Last-Modified, so a date never matches
+        if_range = request.if_range
+        if byte_range is not None and (if_range.date is not None or if_range.etag not in (None, digest)):
+            byte_range = None
+        if byte_range is not None and len(byte_range.ranges) != 1:
+            byte_range = None  # multipart ranges aren't worth it for videos
+
+        if byte_range is None:
+            response = _file_response(path, mimetype, 0, size)
+        else:
+            bounds = byte_range.range_for_length(size)
+            if bounds is None:
+                response = Response(status=416)
+                response.headers['Content-Range'] = f"bytes */{size}"
+            else:
+                start, stop = bounds
+                response = _file_response(path, mimetype, start, stop - start)
+                response.status_code = 206
+                response.headers['Content-Range'] = f"bytes {start}-{stop - 1}/{size}"
+
+    response.set_etag(digest)
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Cache-Control'] = IMMUTABLE
+    return response
+
+
+def init_app(app):
+    app.extensions['assets'] = AssetManifest(app.static_folder)
+    app.register_blueprint(bp)
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.jinja_env.globals['asset_exists'] = asset_exists
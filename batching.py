@@ -0,0 +1,116 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row predictions into one batched call.
+
+    Request threads submit an encoded row and block on a future. A worker thread
+    collects rows until `max_batch_size` is reached or the oldest row has waited
+    `max_wait_ms`, scores them with one predict call per model bundle and fans the
+    results back out. This only helps when requests actually run concurrently,
+    i.e. with a threaded gunicorn worker class.
+    """
+
+    def __init__(self, max_batch_size=64, max_wait_ms=2.0):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._max_batch = 0
+        self._sizes = {}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._worker = None
+
+    @property
+    def running(self):
+        return self._worker is not None and self._worker.is_alive()
+
+    def start(self):
+        """Start the worker thread; also restarts it in a process forked from this one."""
+        if self.running:
+            return
+        if self._worker is not None:
+            # A forked copy of the queue still lists the parent's worker as a
+            # waiter, and a put() would spend its notify() on that dead thread
+            self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def predict(self, bundle, row, timeout=30.0):
+        """Score one encoded 1-D row with bundle and return the prediction as a float.
+
+        The row is only read before the future resolves, so a per-thread scratch
+        buffer can be passed without copying.
+        """
+        future = Future()
+        self._queue.put((bundle, row, time.perf_counter(), future))
+        return future.result(timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'batches': self._batches,
+                'rows': self._rows,
+                'mean_batch_size': self._rows / self._batches if self._batches else 0.0,
+                'max_batch_size': self._max_batch,
+                'batch_sizes': {str(size): count for size, count in sorted(self._sizes.items())},
+                'mean_wait_ms': 1000.0 * self._wait_total / self._rows if self._rows else 0.0,
+                'max_wait_ms': 1000.0 * self._wait_max,
+                'config': {'max_batch_size': self.max_batch_size, 'max_wait_ms': 1000.0 * self.max_wait},
+            }
+
+    def _collect(self):
+        items = [self._queue.get()]
+        deadline = items[0][2] + self.max_wait
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                items.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            started = time.perf_counter()
+
+            # Rows scored by different bundles (around a hot reload) can't share a call
+            groups = {}
+            for item in items:
+                groups.setdefault(id(item[0]), []).append(item)
+
+            for group in groups.values():
+                bundle = group[0][0]
+                try:
+                    predictions = bundle.predict(np.vstack([row for _, row, _, _ in group]))
+                except Exception as e:
+                    logging.error(f"Error in batched prediction: {str(e)}")
+                    for item in group:
+                        item[3].set_exception(e)
+                    continue
+                for item, price in zip(group, predictions):
+                    item[3].set_result(float(price))
+
+            self._record(len(items), [started - item[2] for item in items])
+
+    def _record(self, size, waits):
+        with self._stats_lock:
+            self._batches += 1
+            self._rows += size
+            self._max_batch = max(self._max_batch, size)
+            # Power-of-two buckets keep the histogram small
+            bucket = 1 << (size - 1).bit_length()
+            self._sizes[bucket] = self._sizes.get(bucket, 0) + 1
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
@@ -0,0 +1,84 @@
+"""Throughput and latency of /api/predict under different gunicorn settings.
+
+Starts gunicorn once per setting and runs closed-loop clients that post one
+record at a time, each over its own keep-alive connection. Connections reset
+when max_requests recycles a worker are reopened and counted.
+
+    python benchmarks/bench_gunicorn.py [--clients 16] [--seconds 10]
+"""
+import argparse
+import http.client
+import json
+import signal
+import threading
+import time
+
+import numpy as np
+
+from harness import RECORD, free_port, start_gunicorn
+
+SETTINGS = [
+    ('old Procfile (sync x1, no preload)', ('-w', '1'), {}),
+    ('sync x1, preload', ('-c', 'gunicorn.conf.py', '-w', '1'), {}),
+    ('sync x2, preload', ('-c', 'gunicorn.conf.py', '-w', '2'), {}),
+    ('gthread x1 t4, preload', ('-c', 'gunicorn.conf.py', '-w', '1'), {'GUNICORN_THREADS': '4'}),
+    ('gthread x1 t4, micro-batching 2ms', ('-c', 'gunicorn.conf.py', '-w', '1'),
+     {'GUNICORN_THREADS': '4', 'MICROBATCH_MAX_WAIT_MS': '2'}),
+]
+
+
+def client(port, stop, latencies, resets):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    body = json.dumps(RECORD)
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            conn.request('POST', '/api/predict', body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+        except (ConnectionError, http.client.RemoteDisconnected):
+            # max_requests recycled the worker under a kept-alive connection
+            conn.close()
+            resets.append(1)
+            continue
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+        latencies.append(time.perf_counter() - started)
+
+
+def run(port, clients, seconds):
+    stop = threading.Event()
+    latencies, resets = [], []
+    threads = [threading.Thread(target=client, args=(port, stop, latencies, resets)) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    ms = np.array(latencies) * 1e3
+    return len(latencies) / seconds, np.percentile(ms, 50), np.percentile(ms, 99), len(resets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{args.clients} closed-loop clients, {args.seconds:.0f}s per setting")
+    print(f"{'setting':<40} {'req/s':>7} {'p50 ms':>8} {'p99 ms':>8} {'resets':>7}")
+    for name, gunicorn_args, env in SETTINGS:
+        port = free_port()
+        proc = start_gunicorn(port, gunicorn_args, env)
+        try:
+            run(port, args.clients, 1)  # warm-up
+            rps, p50, p99, resets = run(port, args.clients, args.seconds)
+            print(f"{name:<40} {rps:>7.0f} {p50:>8.1f} {p99:>8.1f} {resets:>7}")
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Throughput of /api/predict over a workers x INFERENCE_THREADS x batch size matrix.
+
+For each combination gunicorn is started with gunicorn.conf.py and as many
+closed-loop clients as workers, each posting batches of the given size.
+
+    python benchmarks/bench_parallelism.py [--workers 1 2] [--threads 1 2 4]
+                                           [--batches 1 256 8192] [--seconds 5]
+"""
+import argparse
+import csv
+import http.client
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+import numpy as np
+
+from harness import ROOT, free_port, start_gunicorn
+
+
+sys.path.insert(0, ROOT)
+from features import record_from_csv_row  # noqa: E402
+
+
+def load_records(count):
+    with open(os.path.join(ROOT, 'Data_Train.csv'), newline='') as file:
+        records = [record_from_csv_row(row) for row in csv.DictReader(file)]
+    return [records[i % len(records)] for i in range(count)]
+
+
+def client(port, body, stop, latencies):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    while not stop.is_set():
+        started = time.perf_counter()
+        conn.request('POST', '/api/predict', body, {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+        latencies.append(time.perf_counter() - started)
+
+
+def run(port, body, clients, seconds):
+    stop = threading.Event()
+    latencies = []
+    threads = [threading.Thread(target=client, args=(port, body, stop, latencies)) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return len(latencies), np.percentile(np.array(latencies) * 1e3, 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--batches', type=int, nargs='+', default=[1, 256, 8192])
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    records = load_records(max(args.batches))
+    bodies = {size: json.dumps(records[0] if size == 1 else records[:size]) for size in args.batches}
+
+    print(f"{os.cpu_count()} CPUs, {args.seconds:.0f}s per cell, one closed-loop client per worker")
+    print(f"{'workers':>7} {'threads':>7} {'batch':>6} {'req/s':>8} {'rows/s':>9} {'p50 ms':>8}")
+    for workers in args.workers:
+        for threads in args.threads:
+            port = free_port()
+            proc = start_gunicorn(port, ('-c', 'gunicorn.conf.py', '-w', str(workers)),
+                                  {'INFERENCE_THREADS': str(threads), 'WARMUP_REQUESTS': '16'})
+            try:
+                for size in args.batches:
+                    run(port, bodies[size], workers, 0.5)  # warm-up
+                    requests, p50 = run(port, bodies[size], workers, args.seconds)
+                    print(f"{workers:>7} {threads:>7} {size:>6} {requests / args.seconds:>8.1f} "
+                          f"{requests * size / args.seconds:>9.0f} {p50:>8.2f}")
+            finally:
+                proc.send_signal(signal.SIGTERM)
+                proc.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Hit rate and latency of per-worker caches vs. a node-wide shared cache tier.
+
+Forks WORKERS processes that each serve REQUESTS predictions drawn from a
+skewed (Zipf) distribution over listings from Data_Train.csv, the way a
+round-robin load balancer would spread repeated traffic. Every request is
+encoded, looked up in the cache and scored on a miss, once with only a
+per-worker PredictionCache and once with the same cache in front of a
+SharedPredictionCache.
+
+    python benchmarks/bench_shared_cache.py [--workers 4] [--requests 20000]
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bundle import load_bundle  # noqa: E402
+from cache import PredictionCache, SharedPredictionCache, TieredCache, row_key  # noqa: E402
+from features import record_from_csv_row  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def traffic(n_requests, n_distinct, seed, skew=1.1):
+    """Indices into a pool of distinct listings with Zipf-like popularity."""
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, n_distinct + 1) ** skew
+    return rng.choice(n_distinct, size=n_requests, p=weights / weights.sum())
+
+
+# Set before forking so workers inherit the model and the listings instead of
+# having them pickled over
+STATE = {}
+
+
+def serve(seed):
+    bundle, records, cache_factory, n_requests = (
+        STATE['bundle'], STATE['records'], STATE['cache_factory'], STATE['n_requests'])
+    cache = cache_factory()
+    latencies = np.empty(n_requests)
+
+    for i, index in enumerate(traffic(n_requests, len(records), seed)):
+        started = time.perf_counter()
+        X = bundle.encoder.encode(records[index])
+        key = row_key(X[0])
+        if cache.get(bundle.version, key) is None:
+            cache.put(bundle.version, key, float(bundle.predict(X)[0]))
+        latencies[i] = time.perf_counter() - started
+
+    stats = cache.stats()
+    local = stats.get('local', stats)
+    shared = stats.get('shared')
+    hits = local['hits'] + (shared['hits'] if shared else 0)
+    return hits, n_requests, latencies
+
+
+def run(bundle, records, cache_factory, workers, n_requests):
+    STATE.update(bundle=bundle, records=records, cache_factory=cache_factory, n_requests=n_requests)
+    ctx = multiprocessing.get_context('fork')
+    with ctx.Pool(workers) as pool:
+        results = pool.map(serve, range(workers))
+    hits = sum(r[0] for r in results)
+    total = sum(r[1] for r in results)
+    latencies = np.concatenate([r[2] for r in results]) * 1e6
+    return hits / total, latencies.mean(), np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH', os.path.join(ROOT, 'updated_model.pkl')))
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=20000, help='requests per worker')
+    parser.add_argument('--cache-size', type=int, default=1000, help='per-worker cache entries')
+    args = parser.parse_args()
+
+    bundle = load_bundle(args.model)
+    with open(os.path.join(ROOT, 'Data_Train.csv')) as file:
+        records = [record_from_csv_row(row) for row in csv.DictReader(file)]
+
+    shared_path = os.path.join(tempfile.mkdtemp(dir='/dev/shm' if os.path.isdir('/dev/shm') else None),
+                               'bench-cache.sqlite')
+    SharedPredictionCache(shared_path)
+
+    modes = {
+        'per-worker LRU': lambda: PredictionCache(args.cache_size),
+        'LRU + shared SQLite': lambda: TieredCache(PredictionCache(args.cache_size),
+                                                   SharedPredictionCache(shared_path)),
+    }
+
+    print(f"{args.workers} workers x {args.requests} requests, {len(records)} distinct listings, "
+          f"{args.cache_size} local entries per worker")
+    print(f"{'mode':<22} {'hit rate':>9} {'mean us':>9} {'p50 us':>8} {'p99 us':>8}")
+    for name, factory in modes.items():
+        hit_rate, mean, p50, p99 = run(bundle, records, factory, args.workers, args.requests)
+        print(f"{name:<22} {hit_rate:>8.1%} {mean:>9.1f} {p50:>8.1f} {p99:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
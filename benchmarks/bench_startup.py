@@ -0,0 +1,96 @@
+"""Cold-start cost: `-X importtime` breakdown of `import app` and time to first request.
+
+Each configuration is measured in fresh processes:
+
+    pickle          MODEL_PATH=updated_model.pkl (unpickling imports sklearn)
+    artifact cache  the same pickle with a populated ARTIFACT_CACHE_DIR
+    artifact        MODEL_PATH pointing at an exported artifact directory
+
+Time to first request runs from spawning gunicorn (one sync worker) to the
+first successful /api/predict response.
+
+    python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import http.client
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from harness import RECORD, ROOT, free_port, start_gunicorn
+
+# Top-level imports worth reporting on their own
+MODULES = ('flask', 'numpy', 'brotli', 'sklearn', 'pandas', 'scipy')
+
+
+def import_times(env):
+    """Cumulative import time in ms of `app` and of each module in MODULES."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=ROOT, env=dict(os.environ, **env), capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)$', line)
+        if match and match.group(3) in MODULES + ('app',):
+            # A module is counted where it is first imported, which may be nested
+            times.setdefault(match.group(3), int(match.group(1)) / 1e3)
+    return times
+
+
+def time_to_first_request(env):
+    port = free_port()
+    started = time.perf_counter()
+    proc = start_gunicorn(port, ('-w', '1'), env)
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        conn.request('POST', '/api/predict', json.dumps(RECORD), {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+        return (time.perf_counter() - started) * 1e3
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    pickle_path = os.path.join(ROOT, 'updated_model.pkl')
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact_path = os.path.join(tmp, 'artifact')
+        subprocess.run([sys.executable, 'artifact.py', 'export', pickle_path, artifact_path],
+                       cwd=ROOT, check=True, capture_output=True)
+        cache_dir = os.path.join(tmp, 'cache')
+        configs = [
+            ('pickle', {'MODEL_PATH': pickle_path}),
+            ('artifact cache', {'MODEL_PATH': pickle_path, 'ARTIFACT_CACHE_DIR': cache_dir}),
+            ('artifact', {'MODEL_PATH': artifact_path}),
+        ]
+        import_times(configs[1][1])  # populates the artifact cache
+
+        print(f"median of {args.runs} runs, ms (- = not imported)")
+        print(f"{'config':<16} {'ttfr':>7} {'app':>7} " + ' '.join(f"{name:>7}" for name in MODULES))
+        for name, env in configs:
+            runs = [import_times(env) for _ in range(args.runs)]
+            ttfr = np.median([time_to_first_request(env) for _ in range(args.runs)])
+            cells = []
+            for module in ('app',) + MODULES:
+                values = [run[module] for run in runs if module in run]
+                cells.append(f"{np.median(values):>7.1f}" if values else f"{'-':>7}")
+            print(f"{name:<16} {ttfr:>7.0f} " + ' '.join(cells))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Worker occupancy while serving the background videos next to predictions.
+
+Starts gunicorn with a few sync workers and, for each way of serving the video
+(Flask's /static handler and the fingerprinted /assets route), runs video
+clients that fetch landing_video.mp4 the way browsers do (`Range: bytes=0-`)
+alongside one client posting /api/predict. With sync workers every request
+holds a worker for its whole duration, so the video throughput and the time per
+video show how much worker capacity the videos take, and the prediction
+latency shows what is left for pricing traffic.
+
+    python benchmarks/bench_static_video.py [--workers 2] [--video-clients 4] [--seconds 10]
+"""
+import argparse
+import http.client
+import json
+import re
+import signal
+import threading
+import time
+
+import numpy as np
+
+from harness import RECORD, free_port, start_gunicorn
+
+
+def fetch_video(port, url, stop, durations):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while not stop.is_set():
+        started = time.perf_counter()
+        conn.request('GET', url, headers={'Range': 'bytes=0-'})
+        response = conn.getresponse()
+        response.read()
+        durations.append(time.perf_counter() - started)
+
+
+def predict_loop(port, stop, latencies):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    body = json.dumps(RECORD)
+    while not stop.is_set():
+        started = time.perf_counter()
+        conn.request('POST', '/api/predict', body, {'Content-Type': 'application/json'})
+        conn.getresponse().read()
+        latencies.append(time.perf_counter() - started)
+
+
+def run(port, url, video_clients, seconds):
+    stop = threading.Event()
+    video, predict = [], []
+    threads = [threading.Thread(target=fetch_video, args=(port, url, stop, video)) for _ in range(video_clients)]
+    threads.append(threading.Thread(target=predict_loop, args=(port, stop, predict)))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    video_ms = np.array(video) * 1e3
+    predict_ms = np.array(predict) * 1e3
+    return {
+        'video_requests': len(video),
+        'video_mean_ms': video_ms.mean(),
+        'videos_per_s': len(video) / seconds,
+        'predictions': len(predict),
+        'predict_p50_ms': np.percentile(predict_ms, 50),
+        'predict_p99_ms': np.percentile(predict_ms, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--video-clients', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    port = free_port()
+    proc = start_gunicorn(port, ('-w', str(args.workers)))
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        conn.request('GET', '/')
+        assets_url = re.search(r'src="(/assets/landing_video[^"]+)"', conn.getresponse().read().decode()).group(1)
+
+        print(f"gunicorn sync x{args.workers}, {args.video_clients} video clients + 1 predict client, "
+              f"{args.seconds:.0f}s per mode")
+        print(f"{'route':<40} {'videos':>7} {'videos/s':>9} {'ms/video':>9} "
+              f"{'predicts':>9} {'p50 ms':>7} {'p99 ms':>7}")
+        for url in ('/static/landing_video.mp4', assets_url):
+            r = run(port, url, args.video_clients, args.seconds)
+            print(f"{url:<40} {r['video_requests']:>7} {r['videos_per_s']:>9.1f} {r['video_mean_ms']:>9.2f} "
+                  f"{r['predictions']:>9} {r['predict_p50_ms']:>7.2f} {r['predict_p99_ms']:>7.2f}")
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Page render latency: inline render_template_string vs. precompiled templates.
+
+"before" parses and compiles the template source on every call, which is what
+home() and predict() used to do; "after" is what the routes do now
+(pre-rendered bytes for the static pages, a cached compiled template for the
+result page).
+
+    python benchmarks/bench_templates.py [--iterations 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import render_template, render_template_string  # noqa: E402
+
+import app as service  # noqa: E402
+
+
+def timed(fn, iterations):
+    fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = service.app
+    source = {
+        name: app.jinja_loader.get_source(app.jinja_env, name)[0]
+        for name in ('home.html', 'predict_form.html', 'result.html')
+    }
+
+    cases = [
+        ('/ (home.html)',
+         lambda: render_template_string(source['home.html']),
+         lambda: service.render_static_page('home.html')),
+        ('/pre (predict_form.html)',
+         lambda: render_template_string(source['predict_form.html']),
+         lambda: service.render_static_page('predict_form.html')),
+        ('/predict (result.html)',
+         lambda: render_template_string(source['result.html'], prediction=10.79),
+         lambda: render_template('result.html', prediction=10.79)),
+    ]
+
+    print(f"{'page':<26} {'before us':>10} {'after us':>10} {'speedup':>8}")
+    with app.test_request_context('/'):
+        for name, before, after in cases:
+            before_us = timed(before, args.iterations)
+            after_us = timed(after, args.iterations)
+            print(f"{name:<26} {before_us:>10.1f} {after_us:>10.1f} {before_us / after_us:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
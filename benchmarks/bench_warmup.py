@@ -0,0 +1,61 @@
+"""Latency of the first predictions a fresh gunicorn worker serves, with and without warm-up.
+
+    python benchmarks/bench_warmup.py [--requests 5] [--runs 3]
+"""
+import argparse
+import http.client
+import json
+import signal
+import time
+
+import numpy as np
+
+from harness import RECORD, free_port, start_gunicorn
+
+SETTINGS = [
+    ('no warm-up', {'WARMUP_REQUESTS': '0'}),
+    ('warm-up (64 requests)', {'WARMUP_REQUESTS': '64'}),
+]
+
+
+def first_requests(env, count):
+    port = free_port()
+    proc = start_gunicorn(port, ('-c', 'gunicorn.conf.py', '-w', '1'), env)
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        conn.request('GET', '/readyz')
+        response = conn.getresponse()
+        response.read()
+        ready = response.status == 200
+
+        # A different record each time, so nothing is answered from a cache
+        timings = []
+        for i in range(count):
+            record = dict(RECORD, Kilometers_Driven=RECORD['Kilometers_Driven'] + i)
+            started = time.perf_counter()
+            conn.request('POST', '/api/predict', json.dumps(record), {'Content-Type': 'application/json'})
+            conn.getresponse().read()
+            timings.append((time.perf_counter() - started) * 1e3)
+        return ready, timings
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"median ms of request #1..#{args.requests} over {args.runs} fresh workers")
+    print(f"{'setting':<24} {'ready':>6} " + ' '.join(f"{f'#{i + 1}':>7}" for i in range(args.requests)))
+    for name, env in SETTINGS:
+        runs = [first_requests(env, args.requests) for _ in range(args.runs)]
+        ready = all(r for r, _ in runs)
+        medians = np.median([t for _, t in runs], axis=0)
+        print(f"{name:<24} {str(ready):>6} " + ' '.join(f"{ms:>7.2f}" for ms in medians))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Helpers shared by the benchmarks that run the app under a real gunicorn."""
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+RECORD = {
+    'Year': 2015, 'Kilometers_Driven': 41000, 'Engine': 1582, 'Power': 126.2, 'Seats': 5,
+    'Location': 'Pune', 'Fuel_Type': 'Diesel', 'Transmission': 'Manual', 'Owner_Type': 'First'
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(port, args=('-w', '1'), env=None):
+    """Start `gunicorn app:app` on 127.0.0.1:port and wait until it answers."""
+    full_env = dict(os.environ)
+    full_env.setdefault('MODEL_PATH', os.path.join(ROOT, 'updated_model.pkl'))
+    full_env.update(env or {})
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', *args, '-b', f"127.0.0.1:{port}", 'app:app'],
+        cwd=ROOT, env=full_env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError('gunicorn did not start')
@@ -0,0 +1,219 @@
+"""Open-loop load generator: replay captured traffic or CSV rows at a fixed rate.
+
+Requests are scheduled at fixed intervals (or Poisson arrivals) regardless of
+how fast the server answers. A pool of connections sends each request at its
+scheduled time; when every connection is busy, requests go out late.
+Latency is measured from the scheduled time, not the actual send, so time
+spent queued behind a slow response is counted. This corrects for
+coordinated omission. The service time (from the actual send) is reported
+next to it.
+
+Sources:
+    --capture PATH...   files or directories written by CAPTURE_DIR
+                        (requests-*.jsonl[.gz]); batch records replay as batches
+    --csv PATH...       Data_Train.csv / Data_Test.csv rows (default: Data_Train.csv)
+
+Targets:
+    --url URL           a running server
+    --gunicorn          start gunicorn -c gunicorn.conf.py locally (--workers)
+    --test-client       the Flask test client in this process
+
+    python benchmarks/loadgen.py --gunicorn --rate 500 --duration 20
+    python benchmarks/loadgen.py --url http://127.0.0.1:8000 --capture /var/capture --rate 200
+"""
+import argparse
+import csv
+import glob
+import gzip
+import http.client
+import json
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from harness import ROOT, free_port, start_gunicorn
+
+sys.path.insert(0, ROOT)
+from features import record_from_csv_row  # noqa: E402
+
+PERCENTILES = (50, 95, 99, 99.9)
+
+
+def _capture_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(glob.glob(os.path.join(path, 'requests-*.jsonl*')))
+        else:
+            yield path
+
+
+def load_capture(paths):
+    """Request bodies from capture files: one record, or a list for a batch."""
+    bodies = []
+    for path in _capture_files(paths):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    bodies.append(json.loads(line)['input'])
+    return bodies
+
+
+def load_csv(paths):
+    bodies = []
+    for path in paths:
+        with open(path, newline='') as file:
+            bodies.extend(record_from_csv_row(row) for row in csv.DictReader(file))
+    return bodies
+
+
+class HTTPTarget:
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.path = parts.path.rstrip('/') + '/api/predict'
+        self._local = threading.local()
+
+    def send(self, body):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            conn.request('POST', self.path, body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            raise
+
+
+class TestClientTarget:
+    """Calls the app in-process; client and server share one interpreter and its GIL."""
+
+    def __init__(self):
+        os.environ.setdefault('MODEL_PATH', os.path.join(ROOT, 'updated_model.pkl'))
+        os.chdir(ROOT)
+        import app as service
+
+        self.client = service.app.test_client()
+
+    def send(self, body):
+        return self.client.post('/api/predict', data=body, content_type='application/json').status_code
+
+
+def run(target, bodies, rate, duration, connections=64, poisson=False, seed=0):
+    """Send rate * duration requests open-loop and return the latency summary."""
+    rng = random.Random(seed)
+    count = max(1, int(rate * duration))
+    gaps = [rng.expovariate(rate) if poisson else 1.0 / rate for _ in range(count)]
+    offsets = np.cumsum(gaps) - gaps[0]
+    payloads = [json.dumps(bodies[rng.randrange(len(bodies))]) for _ in range(count)]
+
+    latency = np.zeros(count)
+    service = np.zeros(count)
+    status = np.zeros(count, dtype=np.int32)
+    next_index = iter(range(count))
+    index_lock = threading.Lock()
+    start = time.perf_counter() + 0.1
+
+    def worker():
+        while True:
+            with index_lock:
+                i = next(next_index, None)
+            if i is None:
+                return
+            scheduled = start + offsets[i]
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            sent = time.perf_counter()
+            try:
+                status[i] = target.send(payloads[i])
+            except Exception:
+                status[i] = -1
+            done = time.perf_counter()
+            latency[i] = done - scheduled
+            service[i] = done - sent
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    errors = int(np.count_nonzero((status < 200) | (status >= 300)))
+    return {
+        'requests': count,
+        'target_rate': rate,
+        'throughput': (count - errors) / elapsed,
+        'error_rate': errors / count if count else 0.0,
+        'latency_ms': {f"p{p:g}": float(np.percentile(latency, p) * 1e3) for p in PERCENTILES},
+        'service_ms': {f"p{p:g}": float(np.percentile(service, p) * 1e3) for p in PERCENTILES},
+        'max_ms': float(latency.max() * 1e3),
+    }
+
+
+def report(result):
+    print(f"{result['requests']} requests at {result['target_rate']:g}/s: "
+          f"throughput {result['throughput']:.1f}/s, errors {100 * result['error_rate']:.2f}%")
+    print(f"{'':<28}" + ''.join(f"{name:>9}" for name in result['latency_ms']) + f"{'max':>9}")
+    print(f"{'latency (from schedule) ms':<28}" + ''.join(f"{v:>9.2f}" for v in result['latency_ms'].values())
+          + f"{result['max_ms']:>9.2f}")
+    print(f"{'service time ms':<28}" + ''.join(f"{v:>9.2f}" for v in result['service_ms'].values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--capture', nargs='+', metavar='PATH')
+    source.add_argument('--csv', nargs='+', metavar='PATH')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url')
+    target.add_argument('--gunicorn', action='store_true')
+    target.add_argument('--test-client', action='store_true')
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn workers with --gunicorn')
+    parser.add_argument('--rate', type=float, default=200, help='requests per second')
+    parser.add_argument('--duration', type=float, default=10, help='seconds')
+    parser.add_argument('--connections', type=int, default=64, help='most requests in flight at once')
+    parser.add_argument('--poisson', action='store_true', help='exponential inter-arrival times')
+    parser.add_argument('--json', action='store_true', help='print the result as JSON')
+    args = parser.parse_args()
+
+    bodies = load_capture(args.capture) if args.capture else load_csv(args.csv or [os.path.join(ROOT, 'Data_Train.csv')])
+    if not bodies:
+        sys.exit('no requests to replay')
+
+    proc = None
+    if args.test_client:
+        runner = TestClientTarget()
+    elif args.url:
+        runner = HTTPTarget(args.url)
+    else:
+        port = free_port()
+        proc = start_gunicorn(port, ('-c', 'gunicorn.conf.py', '-w', str(args.workers)))
+        runner = HTTPTarget(f"http://127.0.0.1:{port}")
+
+    try:
+        result = run(runner, bodies, args.rate, args.duration, args.connections, args.poisson)
+    finally:
+        if proc is not None:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        report(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,339 @@
+"""Benchmark suite for every stage of the serving path, with a stored history.
+
+    python benchmarks/suite.py run [--label NAME] [--only PREFIX] [--quick]
+    python benchmarks/suite.py compare [BASE] [HEAD] [--threshold 0.10]
+    python benchmarks/suite.py list
+
+`run` times each benchmark in-process and appends one JSON line to the
+history file (benchmarks/history.jsonl by default): the commit, the machine
+and the median/min time per call of every benchmark. `compare` lines two
+entries up, by default the last two, and exits with status 1 when any
+benchmark got slower than the threshold. BASE and HEAD are a position
+(-1 is the latest entry), a label or a commit prefix.
+
+Stages:
+    parse.*     request body parsing in a fresh request context
+    encode.*    FeatureEncoder on one record and on a batch
+    predict.*   ModelBundle.predict for batches of 1 to 100k rows
+    render.*    the pages rendered by / and predict()
+    load.*      unpickling each bundled pickle and load_bundle on it and on
+                its exported artifact
+    e2e.*       whole requests through the Flask test client
+
+Numbers are only comparable between runs on the same machine; compare
+warns when the machine differs.
+"""
+import argparse
+import csv
+import json
+import os
+import pickle
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from harness import RECORD, ROOT
+
+sys.path.insert(0, ROOT)
+
+HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history.jsonl')
+MODEL_PATH = os.path.join(ROOT, 'updated_model.pkl')
+PREDICT_BATCH_SIZES = (1, 10, 100, 1000, 10000, 100000)
+
+FORM = {
+    'year': '2015', 'kilometers': '41000', 'engine': '1582', 'power': '126.2', 'seats': '5',
+    'location': 'Pune', 'fuel_type': 'Diesel', 'transmission': 'Manual', 'owner_type': 'First'
+}
+
+
+def measure(fn, rounds=5, min_time=0.2):
+    """Median and min seconds per call of fn() over `rounds` timed rounds.
+
+    Each round runs fn() as many times as fit in about `min_time` seconds, so
+    fast functions aren't dominated by timer resolution.
+    """
+    fn()
+    started = time.perf_counter()
+    fn()
+    once = time.perf_counter() - started
+    number = max(1, int(min_time / once)) if once > 0 else 1000
+
+    per_call = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - started) / number)
+    return {
+        'median_us': statistics.median(per_call) * 1e6,
+        'min_us': min(per_call) * 1e6,
+        'rounds': rounds,
+        'number': number,
+    }
+
+
+def training_records(count):
+    from features import record_from_csv_row
+
+    with open(os.path.join(ROOT, 'Data_Train.csv'), newline='') as file:
+        records = [record_from_csv_row(row) for row in csv.DictReader(file)]
+    return [records[i % len(records)] for i in range(count)]
+
+
+def parse_benchmarks(service, records):
+    app = service.app
+    single = json.dumps(RECORD)
+    array = json.dumps(records[:100])
+    ndjson = '\n'.join(json.dumps(record) for record in records[:100])
+
+    def parse(body, content_type):
+        def run():
+            with app.test_request_context('/api/predict', method='POST', data=body, content_type=content_type):
+                service.parse_batch_body()
+        return run
+
+    def parse_form():
+        with app.test_request_context('/predict', method='POST', data=FORM):
+            dict(service.request.form)
+
+    yield 'parse.json_single', parse(single, 'application/json')
+    yield 'parse.json_batch_100', parse(array, 'application/json')
+    yield 'parse.ndjson_batch_100', parse(ndjson, 'application/x-ndjson')
+    yield 'parse.form', parse_form
+
+
+def encode_benchmarks(bundle, records):
+    encoder = bundle.encoder
+    batch = records[:1000]
+    yield 'encode.one', lambda: encoder.encode(RECORD)
+    yield 'encode.batch_1000', lambda: encoder.encode_many(batch)
+
+
+def predict_benchmarks(bundle, records):
+    matrix = bundle.encoder.encode_many(records[:1000])[0]
+    for size in PREDICT_BATCH_SIZES:
+        X = np.ascontiguousarray(np.resize(matrix, (size, matrix.shape[1])))
+        yield f"predict.batch_{size}", lambda X=X: bundle.predict(X)
+
+
+def render_benchmarks(service):
+    app = service.app
+
+    def render(fn):
+        def run():
+            with app.test_request_context('/'):
+                fn()
+        return run
+
+    yield 'render.home', render(lambda: service.render_static_page('home.html'))
+    yield 'render.result', render(lambda: service.render_template('result.html', prediction=10.79))
+
+
+def load_benchmarks(workdir):
+    from artifact import export_artifact, read_pickle_bundle
+    from bundle import load_bundle
+
+    for path in sorted(os.path.join(ROOT, name) for name in os.listdir(ROOT) if name.endswith('.pkl')):
+        name = os.path.splitext(os.path.basename(path))[0]
+
+        def unpickle(path=path):
+            with open(path, 'rb') as file:
+                pickle.load(file)
+
+        yield f"load.pickle.{name}", unpickle
+
+        # Only the pickles that hold a whole bundle (model and encoders) can be served
+        try:
+            bundle = load_bundle(path)
+        except (ValueError, AttributeError):
+            continue
+        yield f"load.bundle.{name}", lambda path=path: load_bundle(path)
+
+        if bundle.engine is not None:
+            model, feature_names, label_encoders, numerical_cols, categorical_cols = read_pickle_bundle(path)
+            categories = {feature: le.classes_.tolist() for feature, le in label_encoders.items()}
+            exported = os.path.join(workdir, name)
+            export_artifact(exported, bundle.engine, feature_names, categories, numerical_cols, categorical_cols,
+                            source=os.path.basename(path))
+            yield f"load.artifact.{name}", lambda exported=exported: load_bundle(exported)
+
+
+def e2e_benchmarks(service, records):
+    client = service.app.test_client()
+    batch = json.dumps(records[:100])
+    single = json.dumps(RECORD)
+
+    def post(path, **kwargs):
+        def run():
+            response = client.post(path, **kwargs)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path}: HTTP {response.status_code}")
+        return run
+
+    yield 'e2e.home', lambda: client.get('/')
+    yield 'e2e.api_predict_single', post('/api/predict', data=single, content_type='application/json')
+    yield 'e2e.api_predict_batch_100', post('/api/predict', data=batch, content_type='application/json')
+    yield 'e2e.predict_form', post('/predict', data=FORM)
+
+
+def benchmarks(workdir):
+    os.environ.setdefault('MODEL_PATH', MODEL_PATH)
+    os.chdir(ROOT)
+    import app as service
+
+    bundle = service.bundles.current
+    if bundle is None:
+        sys.exit(f"model did not load from {os.environ['MODEL_PATH']}")
+    records = training_records(1000)
+
+    yield from parse_benchmarks(service, records)
+    yield from encode_benchmarks(bundle, records)
+    yield from predict_benchmarks(bundle, records)
+    yield from render_benchmarks(service)
+    yield from load_benchmarks(workdir)
+    yield from e2e_benchmarks(service, records)
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def machine():
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+    }
+
+
+def read_history(path):
+    try:
+        with open(path) as file:
+            return [json.loads(line) for line in file if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def find_entry(history, ref):
+    """A history entry by position, label or commit prefix; the latest match wins."""
+    try:
+        return history[int(ref)]
+    except ValueError:
+        pass
+    except IndexError:
+        sys.exit(f"no history entry at position {ref}")
+    for entry in reversed(history):
+        if entry.get('label') == ref or (entry.get('commit') or '').startswith(ref):
+            return entry
+    sys.exit(f"no history entry matches {ref!r}")
+
+
+def describe(entry):
+    return f"{entry.get('label') or entry.get('commit') or '?'} ({entry['timestamp']})"
+
+
+def run(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, fn in benchmarks(workdir):
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            results[name] = measure(fn, rounds=3 if args.quick else 5, min_time=0.05 if args.quick else 0.2)
+            print(f"{name:<32} {results[name]['median_us']:>14.2f} us  (min {results[name]['min_us']:.2f})",
+                  flush=True)
+
+    entry = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'label': args.label,
+        'machine': machine(),
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    with open(args.history, 'a') as file:
+        file.write(json.dumps(entry, sort_keys=True) + '\n')
+    print(f"appended to {args.history}")
+
+
+def compare(args):
+    history = read_history(args.history)
+    if len(history) < 2 and args.base is None:
+        sys.exit(f"{args.history} needs two entries to compare")
+    base = find_entry(history, args.base if args.base is not None else '-2')
+    head = find_entry(history, args.head)
+
+    print(f"base: {describe(base)}\nhead: {describe(head)}")
+    if base.get('machine') != head.get('machine'):
+        print('warning: the entries were recorded on different machines or software versions')
+
+    regressions = []
+    print(f"\n{'benchmark':<32} {'base us':>12} {'head us':>12} {'change':>8}")
+    for name in sorted(set(base['results']) | set(head['results'])):
+        if name not in base['results'] or name not in head['results']:
+            side = 'head' if name in base['results'] else 'base'
+            print(f"{name:<32} {'(not in ' + side + ')':>34}")
+            continue
+        before = base['results'][name]['median_us']
+        after = head['results'][name]['median_us']
+        change = after / before - 1
+        flag = ''
+        if change > args.threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif change < -args.threshold:
+            flag = '  improved'
+        print(f"{name:<32} {before:>12.2f} {after:>12.2f} {100 * change:>+7.1f}%{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower by more than {100 * args.threshold:g}%")
+        sys.exit(1)
+
+
+def list_history(args):
+    history = read_history(args.history)
+    for i, entry in enumerate(history):
+        print(f"{i - len(history):>4}  {entry['timestamp']}  {entry.get('commit') or '-':<16} "
+              f"{entry.get('label') or ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--history', default=HISTORY, help='JSON lines file of past runs')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks and append the results to the history')
+    run_parser.add_argument('--label', help='name for this run, usable as a compare reference')
+    run_parser.add_argument('--only', nargs='+', metavar='PREFIX', help='benchmarks whose name starts with PREFIX')
+    run_parser.add_argument('--quick', action='store_true', help='fewer and shorter rounds')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser('compare', help='compare two runs and flag regressions')
+    compare_parser.add_argument('base', nargs='?', help='default: the entry before HEAD')
+    compare_parser.add_argument('head', nargs='?', default='-1', help='default: the latest entry')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='relative slowdown of the median that counts as a regression')
+    compare_parser.set_defaults(func=compare)
+
+    list_parser = commands.add_parser('list', help='show the entries of the history')
+    list_parser.set_defaults(func=list_history)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
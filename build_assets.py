@@ -0,0 +1,153 @@
+"""Asset build step: self-host fonts, fingerprint static/ and report page weight.
+
+    python build_assets.py [--fonts-from DIR] [--skip-fonts]
+
+Deploys run it from bin/post_compile, so the slug ships with the fonts and
+the manifest.
+
+1. Puts the Latin subset of Poppins 400/500/600 into static/fonts/, copied
+   from --fonts-from or downloaded from Google Fonts. Once the files exist,
+   the templates inline their @font-face rules and emit <link rel=preload>
+   hints instead of loading the font CSS from fonts.googleapis.com.
+2. Hashes every file in static/ into static/manifest.json, which the app
+   reads at startup for its fingerprinted /assets URLs.
+3. Renders /, /pre and a /predict result and prints the HTML size,
+   subresource requests and bytes for each page.
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import sys
+import urllib.request
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC = os.path.join(ROOT, 'static')
+FONTS = os.path.join(STATIC, 'fonts')
+
+FONT_WEIGHTS = (400, 500, 600)
+FONT_FILE = 'poppins-latin-{weight}.woff2'
+GOOGLE_FONTS_CSS = 'https://fonts.googleapis.com/css2?family=Poppins:wght@400;500;600&display=swap'
+# Google Fonts only serves woff2 to browsers it recognises
+BROWSER_UA = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+SAMPLE_FORM = {
+    'year': '2015', 'kilometers': '41000', 'engine': '1582', 'power': '126.2', 'seats': '5',
+    'location': 'Pune', 'fuel_type': 'Diesel', 'transmission': 'Manual', 'owner_type': 'First'
+}
+
+
+def _get(url):
+    request = urllib.request.Request(url, headers={'User-Agent': BROWSER_UA})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.read()
+
+
+def download_poppins(dest):
+    """Download the Latin subset of each weight listed in the Google Fonts CSS."""
+    css = _get(GOOGLE_FONTS_CSS).decode()
+    # Each subset is introduced by a comment such as /* latin */ or /* latin-ext */
+    for subset, rule in re.findall(r'/\*\s*([\w-]+)\s*\*/\s*(@font-face\s*{[^}]*})', css):
+        if subset != 'latin':
+            continue
+        weight = int(re.search(r'font-weight:\s*(\d+)', rule).group(1))
+        url = re.search(r'url\((https://[^)]+\.woff2)\)', rule).group(1)
+        if weight in FONT_WEIGHTS:
+            with open(os.path.join(dest, FONT_FILE.format(weight=weight)), 'wb') as file:
+                file.write(_get(url))
+
+
+def install_fonts(source=None):
+    os.makedirs(FONTS, exist_ok=True)
+    if source:
+        for weight in FONT_WEIGHTS:
+            shutil.copyfile(os.path.join(source, FONT_FILE.format(weight=weight)),
+                            os.path.join(FONTS, FONT_FILE.format(weight=weight)))
+    else:
+        download_poppins(FONTS)
+
+    missing = [weight for weight in FONT_WEIGHTS
+               if not os.path.exists(os.path.join(FONTS, FONT_FILE.format(weight=weight)))]
+    if missing:
+        raise RuntimeError(f"Poppins weights missing after font install: {missing}")
+
+
+def write_manifest():
+    from assets import MANIFEST_NAME, read_manifest, scan
+
+    files = scan(STATIC, read_manifest(STATIC))
+    with open(os.path.join(STATIC, MANIFEST_NAME), 'w') as file:
+        json.dump({'files': files}, file, indent=2, sort_keys=True)
+    return files
+
+
+# Tags that make the browser fetch something before or while rendering the page
+RESOURCE_PATTERNS = (
+    r'<(?:source|img|script|video|audio)\b[^>]*\ssrc="([^"]+)"',
+    r'<link\b(?=[^>]*\brel="(?:stylesheet|preload|icon)")[^>]*\shref="([^"]+)"',
+    r'url\([\'"]?([^\'")]+)[\'"]?\)',
+)
+
+
+def page_resources(html):
+    urls = []
+    for pattern in RESOURCE_PATTERNS:
+        for url in re.findall(pattern, html):
+            if url not in urls:
+                urls.append(url)
+    return urls
+
+
+def report(files):
+    os.environ.setdefault('MODEL_PATH', os.path.join(ROOT, 'updated_model.pkl'))
+    import app as service
+
+    sizes = {entry['hashed']: entry['size'] for entry in files.values()}
+    sizes.update({name: entry['size'] for name, entry in files.items()})
+    client = service.app.test_client()
+
+    pages = [
+        ('/', client.get('/')),
+        ('/pre', client.get('/pre')),
+        ('/predict', client.post('/predict', data=SAMPLE_FORM)),
+    ]
+
+    print(f"{'page':<10} {'html B':>8} {'gzip B':>7} {'requests':>9} {'local B':>10} {'3rd-party':>10}")
+    for path, response in pages:
+        if response.status_code != 200:
+            print(f"{path:<10} HTTP {response.status_code}")
+            continue
+        html = response.get_data()
+        local_bytes, third_party = 0, 0
+        resources = page_resources(html.decode())
+        for url in resources:
+            if url.startswith(('http://', 'https://', '//')):
+                third_party += 1
+            else:
+                local_bytes += sizes.get(url.rsplit('/assets/', 1)[-1].rsplit('/static/', 1)[-1], 0)
+        print(f"{path:<10} {len(html):>8} {len(gzip.compress(html)):>7} {1 + len(resources):>9} "
+              f"{len(html) + local_bytes:>10} {third_party:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fonts-from', help='directory with poppins-latin-{400,500,600}.woff2')
+    parser.add_argument('--skip-fonts', action='store_true', help="don't fetch or copy fonts")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    if not args.skip_fonts:
+        try:
+            install_fonts(args.fonts_from)
+        except Exception as e:
+            print(f"warning: fonts not installed ({e}); pages keep loading Poppins from Google Fonts")
+
+    files = write_manifest()
+    print(f"wrote static/manifest.json ({len(files)} files)")
+    report(files)
+
+
+if __name__ == '__main__':
+    main()
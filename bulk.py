@@ -0,0 +1,135 @@
+import csv
+import io
+import json
+import re
+
+from features import record_from_csv_row
+
+# Columns appended to every row of a scored CSV
+RESULT_COLUMNS = ('predicted_price', 'error')
+
+# Longest CSV line accepted, in bytes, so a file without newlines can't fill the memory
+MAX_LINE_LENGTH = 1 << 20
+
+UTF8_BOM = b'\xef\xbb\xbf'
+
+# iter_lines turns bytes that aren't UTF-8 into lone surrogates in this range
+ESCAPED_BYTE = re.compile('[\udc80-\udcff]')
+
+
+def iter_lines(stream, block_size=1 << 16):
+    """Text lines from a binary stream, read in fixed-size blocks.
+
+    Works on anything with read(size): WSGI input (also chunked uploads),
+    spooled upload files and regular files. A leading UTF-8 BOM is dropped.
+    Each line is decoded on its own with surrogateescape, so bytes that aren't
+    UTF-8 only spoil their own row (see is_valid_text) instead of the file.
+    """
+    pending = b''
+    started = False
+    while True:
+        block = stream.read(block_size)
+        pending += block
+        if not started and (len(pending) >= len(UTF8_BOM) or not block):
+            pending = pending[len(UTF8_BOM):] if pending.startswith(UTF8_BOM) else pending
+            started = True
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            yield line.decode('utf-8', 'surrogateescape') + '\n'
+        if len(pending) > MAX_LINE_LENGTH:
+            raise ValueError(f"CSV line longer than {MAX_LINE_LENGTH} bytes")
+        if not block:
+            break
+    if pending:
+        yield pending.decode('utf-8', 'surrogateescape')
+
+
+def is_valid_text(cells):
+    text = ''.join(cells)
+    return text.isascii() or not ESCAPED_BYTE.search(text)
+
+
+def printable(cells):
+    """Cells with undecodable bytes replaced by U+FFFD, safe to write out as UTF-8."""
+    return [cell.encode('utf-8', 'surrogateescape').decode('utf-8', 'replace') for cell in cells]
+
+
+def read_chunks(lines, chunk_rows):
+    """Yield (header, rows) for every `chunk_rows` rows of a Data_Test.csv-style file.
+
+    `lines` is any iterable of text lines, e.g. a file or iter_lines(); only
+    one chunk of parsed rows is held at a time.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+
+    chunk = []
+    for row in reader:
+        if not row:
+            continue
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield header, chunk
+            chunk = []
+    if chunk:
+        yield header, chunk
+
+
+def score_rows(bundle, header, rows):
+    """Encode and score CSV rows in one vectorized pass.
+
+    Returns (prices, errors): the price of every row (None for rows that could
+    not be encoded) and the error message of each failed row by index.
+    """
+    records = [record_from_csv_row(dict(zip(header, row))) if is_valid_text(row)
+               else ValueError('Row is not valid UTF-8') for row in rows]
+    matrix, positions, errors = bundle.encoder.encode_many(records)
+    prices = [None] * len(rows)
+    if positions:
+        for i, price in zip(positions, bundle.predict(matrix)):
+            prices[i] = float(price)
+    return prices, {i: str(e) for i, e in errors.items()}
+
+
+def csv_header(header):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(printable(header) + list(RESULT_COLUMNS))
+    return buffer.getvalue()
+
+
+def csv_rows(header, rows, prices, errors):
+    """The rows with their price and error columns, as CSV text.
+
+    Rows are padded or cut to the header's width first, so the results always
+    land in the predicted_price and error columns.
+    """
+    width = len(header)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for i, row in enumerate(rows):
+        if i in errors:
+            row = printable(row)
+        row = row[:width] + [''] * (width - len(row))
+        writer.writerow(row + ['' if prices[i] is None else repr(prices[i]), errors.get(i, '')])
+    return buffer.getvalue()
+
+
+def csv_trailer(header, message):
+    """A last row that carries only an error, for a file whose scoring stopped early."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow([''] * (len(header) + 1) + [message])
+    return buffer.getvalue()
+
+
+def ndjson_rows(start, prices, errors):
+    """One result object per row, numbered from `start`, like the batch API results."""
+    lines = []
+    for i, price in enumerate(prices):
+        if price is None:
+            result = {'index': start + i, 'error': errors[i], 'status': 'error'}
+        else:
+            result = {'index': start + i, 'predicted_price': price, 'status': 'success'}
+        lines.append(json.dumps(result) + '\n')
+    return ''.join(lines)
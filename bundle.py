@@ -0,0 +1,278 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from artifact import MANIFEST, export_artifact, is_artifact, load_artifact, read_pickle_bundle
+from features import FeatureEncoder
+from forest import compile_model
+
+# sklearn's compiled tree walk overtakes the NumPy evaluator on large batches
+NATIVE_MAX_ROWS = int(os.getenv('NATIVE_MAX_ROWS', '32'))
+
+# Cores one worker may use for a single large batch. gunicorn.conf.py sizes the
+# worker count from the same variable, so workers x threads stays within the CPUs
+INFERENCE_THREADS = max(1, int(os.getenv('INFERENCE_THREADS', '1')))
+
+# Smaller batches run on the request thread; below this, handing chunks to a
+# pool costs more than it saves
+PARALLEL_MIN_ROWS = int(os.getenv('PARALLEL_MIN_ROWS', '2048'))
+
+# Optional directory of artifacts converted from pickles, one per pickle hash.
+# The first start converts the pickle; later starts load the artifact and never
+# import sklearn, nor the pandas and scipy it pulls in. Artifact bundles score
+# every batch size with the NumPy evaluator
+ARTIFACT_CACHE_DIR = os.getenv('ARTIFACT_CACHE_DIR')
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def inference_pool():
+    """The process-wide pool that scores the chunks of large batches.
+
+    All request threads share it, so a worker never runs more than
+    INFERENCE_THREADS chunks at once. Pool threads don't survive fork, so a
+    forked worker builds its own on first use.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(INFERENCE_THREADS, thread_name_prefix='inference')
+            _pool_pid = os.getpid()
+        return _pool
+
+
+class ModelBundle(namedtuple('ModelBundle', [
+        'model', 'engine', 'encoder', 'version', 'path', 'loaded_at', 'load_seconds'])):
+    """Everything needed to serve one model version.
+
+    Bundles are immutable. A request reads the current bundle once and uses it
+    until it finishes, so a reload never mixes the encoder of one model with the
+    trees of another.
+    """
+    __slots__ = ()
+
+    def predict(self, X):
+        """Predict prices for an encoded feature matrix.
+
+        Large batches are split across the inference pool; sklearn's tree walk
+        and NumPy's gathers release the GIL, so the chunks run in parallel.
+        """
+        if INFERENCE_THREADS > 1 and len(X) >= PARALLEL_MIN_ROWS:
+            chunks = np.array_split(X, INFERENCE_THREADS)
+            return np.concatenate(list(inference_pool().map(self._predict_serial, chunks)))
+        return self._predict_serial(X)
+
+    def _predict_serial(self, X):
+        if self.engine is not None and (self.model is None or len(X) <= NATIVE_MAX_ROWS):
+            return self.engine.predict(X)
+        return self.model.predict(X)
+
+    def status(self):
+        return {
+            'version': self.version,
+            'path': self.path,
+            'engine': 'native' if self.engine is not None else 'sklearn',
+            'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.loaded_at)),
+            'load_seconds': round(self.load_seconds, 4),
+        }
+
+
+def _file_version(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def load_bundle(path):
+    """Load a pickled model bundle or an artifact directory into a ModelBundle."""
+    started = time.perf_counter()
+
+    if is_artifact(path):
+        # Memory-mapped node arrays; no sklearn objects involved
+        artifact = load_artifact(path)
+        model, engine, version = None, artifact.engine, artifact.version
+        encoder = FeatureEncoder(artifact.feature_names, artifact.categories)
+    else:
+        version = _file_version(path)
+        cached = os.path.join(ARTIFACT_CACHE_DIR, version) if ARTIFACT_CACHE_DIR else None
+
+        if cached is not None and is_artifact(cached):
+            artifact = load_artifact(cached)
+            model, engine = None, artifact.engine
+            encoder = FeatureEncoder(artifact.feature_names, artifact.categories)
+        else:
+            model, feature_names, label_encoders, numerical_cols, categorical_cols = read_pickle_bundle(path)
+            # Parallelism is decided at serving time (see ModelBundle.predict); a stored
+            # n_jobs would have joblib start its own threads on every call
+            if hasattr(model, 'n_jobs'):
+                model.n_jobs = 1
+            # Tree ensembles are flattened into NumPy arrays and evaluated without sklearn's
+            # per-call validation and joblib dispatch; other models stay on model.predict
+            engine = compile_model(model)
+            encoder = FeatureEncoder.from_label_encoders(feature_names, label_encoders)
+
+            if cached is not None and engine is not None:
+                categories = {feature: le.classes_.tolist() for feature, le in label_encoders.items()}
+                try:
+                    export_artifact(cached, engine, feature_names, categories, numerical_cols, categorical_cols,
+                                    source=os.path.basename(path))
+                except OSError as e:
+                    # e.g. a read-only or full cache directory; the pickle still serves
+                    logging.error(f"Error caching artifact for {path}: {str(e)}")
+
+    return ModelBundle(model, engine, encoder, version, path, time.time(), time.perf_counter() - started)
+
+
+def warm_up(bundle, rounds=3):
+    """Run a few synthetic predictions so first requests don't pay for cold code paths."""
+    batch = np.zeros((8, bundle.encoder.width))
+    for _ in range(rounds):
+        bundle.predict(bundle.encoder.encode({}))
+        bundle.predict(batch)
+
+
+def _stat(path):
+    """Cheap change marker for a pickle file or artifact directory."""
+    target = os.path.join(path, MANIFEST) if os.path.isdir(path) else path
+    try:
+        st = os.stat(target)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _read_generation(path):
+    try:
+        with open(path) as file:
+            return file.read().strip() or None
+    except OSError:
+        return None
+
+
+class BundleHolder:
+    """Holds the current ModelBundle and swaps it atomically on reload.
+
+    Loading and warm-up happen on the reloading thread while requests keep
+    using the old bundle; the swap itself is a single attribute assignment.
+
+    With a `generation_path`, reloads are node-wide: request_reload() writes a
+    new generation to that file and every process watching it reloads.
+
+    `on_install`, when set, is called with each newly installed bundle, after
+    the swap and outside the reload lock.
+    """
+
+    def __init__(self, path, generation_path=None):
+        self.path = path
+        self.generation_path = generation_path
+        self.generation = _read_generation(generation_path) if generation_path else None
+        self.current = None
+        self.last_error = None
+        self.reloads = 0
+        self._reload_lock = threading.Lock()
+        self._seen = None
+        self._watcher = None
+        self.on_install = None
+
+    def reload(self):
+        """Load, warm up and install the model at self.path. Returns the new bundle.
+
+        On failure the previous bundle stays in place and the error is re-raised.
+        """
+        with self._reload_lock:
+            seen = _stat(self.path)
+            try:
+                bundle = load_bundle(self.path)
+                warm_up(bundle)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                self._seen = seen
+
+            previous = self.current
+            self.current = bundle
+            self.last_error = None
+            self.reloads += 1
+
+        if previous is None:
+            logging.info(f"Model {bundle.version} loaded from {bundle.path} in {bundle.load_seconds:.3f}s")
+        else:
+            logging.info(f"Model reloaded: {previous.version} -> {bundle.version} in {bundle.load_seconds:.3f}s")
+        if self.on_install is not None:
+            try:
+                self.on_install(bundle)
+            except Exception as e:
+                logging.error(f"Error after installing model {bundle.version}: {str(e)}")
+        return bundle
+
+    def _reload_logged(self):
+        try:
+            self.reload()
+        except Exception as e:
+            logging.error(f"Error reloading model from {self.path}: {str(e)}")
+
+    def request_reload(self):
+        """Ask for a reload in the background. Returns the new generation, if any.
+
+        Without a generation file only this process reloads, on a new thread;
+        with one, every watching process (this one included) picks the new
+        generation up on its next poll.
+        """
+        if not self.generation_path:
+            threading.Thread(target=self._reload_logged, name='model-reload', daemon=True).start()
+            return None
+
+        generation = f"{time.time_ns()}-{os.getpid()}"
+        tmp = f"{self.generation_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as file:
+            file.write(generation)
+        os.replace(tmp, self.generation_path)
+        return generation
+
+    def status(self):
+        bundle = self.current
+        return {
+            'model': bundle.status() if bundle is not None else None,
+            'reloads': self.reloads,
+            'generation': self.generation,
+            'pid': os.getpid(),
+            'last_error': self.last_error,
+            'watching': self._watcher is not None and self._watcher.is_alive(),
+        }
+
+    def watch(self, interval, watch_path=True):
+        """Poll every `interval` seconds and reload on a new generation or, with
+        `watch_path`, when self.path changes."""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                if self.generation_path:
+                    generation = _read_generation(self.generation_path)
+                    if generation is not None and generation != self.generation:
+                        # Recorded up front: a failed load is reported once, not retried every poll
+                        self.generation = generation
+                        self._reload_logged()
+                        continue
+                if not watch_path:
+                    continue
+                stat = _stat(self.path)
+                if stat is None or stat == self._seen:
+                    continue
+                self._reload_logged()
+
+        self._watcher = threading.Thread(target=run, name='model-watcher', daemon=True)
+        self._watcher.start()
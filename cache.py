@@ -0,0 +1,247 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def row_key(row):
+    """Canonical cache key for an encoded feature row.
+
+    Adding 0.0 folds -0.0 into 0.0 so equal rows always produce the same bytes.
+    """
+    return (row + 0.0).tobytes()
+
+
+class PredictionCache:
+    """Bounded LRU cache of predictions keyed on model version and encoded row.
+
+    Entries older than `ttl` seconds (if set) are treated as misses. The cache
+    is cleared as soon as it sees a different model version, so a hot reload
+    never serves prices computed by the previous model.
+    """
+
+    def __init__(self, maxsize=10000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl or None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._version = version
+
+    def get(self, version, key):
+        """Return the cached prediction or None."""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, version, key, value, expires_in=None):
+        """Cache value; `expires_in` seconds, if given, replaces the ttl for this entry."""
+        if expires_in is not None:
+            expires = time.monotonic() + expires_in
+        else:
+            expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+class SharedPredictionCache:
+    """Prediction cache shared by all worker processes on a node.
+
+    Backed by a SQLite database in WAL mode, ideally on a tmpfs such as
+    /dev/shm: readers never block each other or the writer, so workers can look
+    up each other's predictions for a few microseconds each. Keys are prefixed
+    with the model version, so workers that are briefly on different versions
+    during a reload never see each other's prices. The table is trimmed to
+    `maxsize` rows, oldest first, every `prune_every` writes.
+    """
+
+    def __init__(self, path, maxsize=100000, ttl=None, prune_every=1000):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl or None
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self._connect()
+
+    def _connect(self):
+        """Per-thread connection, reopened after fork."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        import sqlite3  # only needed for the shared tier
+
+        conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.execute('CREATE TABLE IF NOT EXISTS predictions '
+                     '(key BLOB PRIMARY KEY, value REAL, created REAL, expires REAL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS predictions_created ON predictions (created)')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _key(version, key):
+        return f"{version}:".encode() + key
+
+    def _count(self, counter, n=1):
+        # Request threads of a gthread worker share the counters
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def get_entry(self, version, key):
+        """Return (value, seconds left or None) for a cached prediction, or None."""
+        try:
+            row = self._connect().execute(
+                'SELECT value, expires FROM predictions WHERE key = ?', (self._key(version, key),)
+            ).fetchone()
+        except Exception:
+            self._count('errors')
+            return None
+
+        now = time.time()
+        if row is None or (row[1] is not None and row[1] < now):
+            self._count('misses')
+            return None
+        self._count('hits')
+        return row[0], (row[1] - now if row[1] is not None else None)
+
+    def get(self, version, key):
+        entry = self.get_entry(version, key)
+        return entry[0] if entry is not None else None
+
+    def put(self, version, key, value):
+        now = time.time()
+        expires = now + self.ttl if self.ttl else None
+        try:
+            conn = self._connect()
+            conn.execute('INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)',
+                         (self._key(version, key), value, now, expires))
+        except Exception:
+            self._count('errors')
+            return
+
+        with self._lock:
+            self._puts += 1
+            prune = self._puts % self.prune_every == 0
+        if prune:
+            self._prune(conn)
+
+    def _prune(self, conn):
+        try:
+            count = conn.execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
+            excess = count - self.maxsize
+            if excess > 0:
+                conn.execute('DELETE FROM predictions WHERE key IN '
+                             '(SELECT key FROM predictions ORDER BY created LIMIT ?)', (excess,))
+                self._count('evictions', excess)
+        except Exception:
+            self._count('errors')
+
+    def clear(self):
+        self._connect().execute('DELETE FROM predictions')
+
+    def stats(self):
+        try:
+            size = self._connect().execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
+        except Exception:
+            size = None
+        with self._lock:
+            hits, misses, evictions, errors = self.hits, self.misses, self.evictions, self.errors
+        lookups = hits + misses
+        return {
+            'path': self.path,
+            'size': size,
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / lookups if lookups else 0.0,
+            'evictions': evictions,
+            'errors': errors,
+        }
+
+
+class TieredCache:
+    """A per-worker PredictionCache in front of a SharedPredictionCache."""
+
+    def __init__(self, local, shared):
+        self.local = local
+        self.shared = shared
+
+    def get(self, version, key):
+        value = self.local.get(version, key)
+        if value is None:
+            entry = self.shared.get_entry(version, key)
+            if entry is not None:
+                # The local copy expires with the shared row, not a fresh ttl later
+                value, expires_in = entry
+                self.local.put(version, key, value, expires_in)
+        return value
+
+    def put(self, version, key, value):
+        self.local.put(version, key, value)
+        self.shared.put(version, key, value)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def stats(self):
+        return {'local': self.local.stats(), 'shared': self.shared.stats()}
@@ -0,0 +1,166 @@
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+
+# Longest string kept from a captured input field
+MAX_FIELD_LENGTH = 100
+
+
+def sanitize(record, fields):
+    """Keep only the known model inputs of a record, with strings truncated."""
+    if not isinstance(record, dict):
+        return None
+    clean = {}
+    for field in fields:
+        value = record.get(field)
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = value[:MAX_FIELD_LENGTH]
+        elif not isinstance(value, (int, float, bool)):
+            continue
+        clean[field] = value
+    return clean
+
+
+class RequestCapture:
+    """Writes captured requests as JSON lines from a background thread.
+
+    Request threads only put a dict on a bounded queue; when the queue is full
+    the record is dropped and counted instead of waiting. The writer serializes
+    records in batches, appends them to `requests-<pid>.jsonl` in `directory`
+    (one file per worker, so workers never share a file) and rotates the file
+    once it reaches `max_bytes` or `max_seconds`, gzipping it when `compress`
+    is set.
+    """
+
+    def __init__(self, directory, max_bytes=64 << 20, max_seconds=3600, compress=True,
+                 queue_size=10000, batch_size=256, flush_interval=1.0, on_drop=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.compress = compress
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_drop = on_drop
+        self.captured = 0
+        self.dropped = 0
+        self.written = 0
+        self.rotations = 0
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        atexit.register(self.close)
+
+    def start(self):
+        """Start the writer thread; also restarts it in a process forked from this one."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._queue = queue.Queue(self.queue_size)
+        self._thread = threading.Thread(target=self._run, name='request-capture', daemon=True)
+        self._thread.start()
+
+    def submit(self, item, fields):
+        """Queue item for writing; its 'input' is sanitized to `fields` by the writer."""
+        try:
+            self._queue.put_nowait((item, fields))
+        except queue.Full:
+            self._count('dropped')
+            if self.on_drop is not None:
+                self.on_drop()
+            return
+        self._count('captured')
+
+    def _count(self, counter, n=1):
+        # Request threads of a gthread worker share the counters
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def close(self, timeout=5.0):
+        """Write out what is queued; called at exit."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            captured, dropped, written, rotations = self.captured, self.dropped, self.written, self.rotations
+        return {
+            'directory': self.directory,
+            'captured': captured,
+            'dropped': dropped,
+            'written': written,
+            'rotations': rotations,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+        }
+
+    def _path(self):
+        return os.path.join(self.directory, f"requests-{os.getpid()}.jsonl")
+
+    def _run(self):
+        path = self._path()
+        file = None  # opened on the first write, so idle processes leave no files behind
+        opened = 0.0
+        closing = False
+
+        while not closing:
+            batch = []
+            deadline = time.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.time()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                item, fields = item
+                records = item['input']
+                if isinstance(records, list):
+                    item['input'] = [sanitize(record, fields) for record in records]
+                else:
+                    item['input'] = sanitize(records, fields)
+                batch.append(item)
+
+            if batch:
+                try:
+                    if file is None:
+                        os.makedirs(self.directory, exist_ok=True)
+                        file = open(path, 'a', encoding='utf-8')
+                        opened = time.time()
+                    file.write(''.join(json.dumps(item, separators=(',', ':')) + '\n' for item in batch))
+                    file.flush()
+                    self._count('written', len(batch))
+                except (OSError, TypeError, ValueError) as e:
+                    logging.error(f"Error writing captured requests: {str(e)}")
+
+            if file is not None and (file.tell() >= self.max_bytes or time.time() - opened >= self.max_seconds):
+                file.close()
+                file = None
+                self._rotate(path)
+
+        if file is not None:
+            file.close()
+
+    def _rotate(self, path):
+        rotated = f"{path[:-len('.jsonl')]}-{time.strftime('%Y%m%dT%H%M%S')}-{self.rotations}.jsonl"
+        try:
+            os.rename(path, rotated)
+            if self.compress:
+                with open(rotated, 'rb') as source, gzip.open(f"{rotated}.gz", 'wb') as target:
+                    shutil.copyfileobj(source, target)
+                os.remove(rotated)
+            self._count('rotations')
+        except OSError as e:
+            logging.error(f"Error rotating {path}: {str(e)}")
@@ -0,0 +1,134 @@
+import math
+import threading
+
+import numpy as np
+
+# Numerical inputs accepted by the prediction endpoints and how they are parsed
+NUMERICAL_COLUMNS = {
+    'Year': int,
+    'Kilometers_Driven': float,
+    'Engine': float,
+    'Power': float,
+    'Seats': int,
+    'Car_Age': int
+}
+
+# Column names in Data_Train.csv that differ from the fields accepted by the API
+CSV_COLUMN_ALIASES = {
+    'Kilometers Driven': 'Kilometers_Driven',
+    'Fuel Type': 'Fuel_Type',
+    'Owner Type': 'Owner_Type',
+    'Engine (cc)': 'Engine',
+    'Power (bhp)': 'Power',
+}
+
+MISSING_VALUES = ('', 'null', 'nan', 'NaN')
+
+
+def record_from_csv_row(row):
+    """Map a Data_Train.csv / Data_Test.csv row onto the fields accepted by the API.
+
+    Missing values are dropped, so they are encoded as 0 just like a field that
+    is left out of an API request.
+    """
+    record = {}
+    for column, value in row.items():
+        if column is None or value is None:
+            continue
+        value = value.strip()
+        if value in MISSING_VALUES:
+            continue
+        column = column.strip()
+        record[CSV_COLUMN_ALIASES.get(column, column)] = value
+    return record
+
+
+class FeatureEncoder:
+    """Encodes raw input records into float rows ordered like the model's features.
+
+    Everything that depends on the model (column offsets, category codes) is
+    resolved once when the encoder is built, so encoding a record is a handful of
+    dict lookups and writes into a NumPy buffer. Inputs whose column is not one of
+    the model's features are ignored.
+    """
+
+    def __init__(self, feature_names, categories, numerical_columns=NUMERICAL_COLUMNS):
+        self.feature_names = list(feature_names)
+        self.width = len(self.feature_names)
+
+        offsets = {name: i for i, name in enumerate(self.feature_names)}
+        self._numerical = [
+            (col, offsets[col], cast)
+            for col, cast in numerical_columns.items()
+            if col in offsets
+        ]
+        # LabelEncoder codes are the positions of the labels in classes_
+        self._categorical = [
+            (feature, offsets[feature], {label: float(code) for code, label in enumerate(classes)})
+            for feature, classes in categories.items()
+            if feature in offsets
+        ]
+        self._local = threading.local()
+
+    @classmethod
+    def from_label_encoders(cls, feature_names, label_encoders):
+        categories = {feature: list(encoder.classes_) for feature, encoder in label_encoders.items()}
+        return cls(feature_names, categories)
+
+    def encode_into(self, record, out):
+        """Write the encoded record into the 1-D float array `out`."""
+        if not isinstance(record, dict):
+            raise ValueError('Each record must be a JSON object')
+
+        out.fill(0.0)
+
+        for col, offset, cast in self._numerical:
+            if col in record:
+                value = cast(record[col])
+                # float() accepts 'nan' and 'inf'; the model must never see them
+                if not math.isfinite(value):
+                    raise ValueError(f"Invalid {col}: {record[col]!r}")
+                out[offset] = value
+
+        for feature, offset, codes in self._categorical:
+            if feature in record:
+                value = record[feature]
+                code = codes.get(value) if isinstance(value, str) else None
+                if code is None:
+                    raise ValueError(f"Unknown {feature}: {value!r}")
+                out[offset] = code
+
+        return out
+
+    def encode(self, record):
+        """Encode one record into a (1, width) matrix.
+
+        The matrix is a per-thread scratch buffer that is overwritten by the next
+        call on the same thread, so it must be consumed (or copied) right away.
+        """
+        buffer = getattr(self._local, 'row', None)
+        if buffer is None:
+            buffer = self._local.row = np.zeros((1, self.width), dtype=np.float64)
+        self.encode_into(record, buffer[0])
+        return buffer
+
+    def encode_many(self, records):
+        """Encode a list of records into one matrix.
+
+        Returns (matrix, positions, errors): row k of the matrix holds the record at
+        positions[k], and errors maps the index of every record that could not be
+        encoded to its exception.
+        """
+        matrix = np.zeros((len(records), self.width), dtype=np.float64)
+        positions, errors = [], {}
+
+        for i, record in enumerate(records):
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                self.encode_into(record, matrix[len(positions)])
+                positions.append(i)
+            except Exception as e:
+                errors[i] = e
+
+        return matrix[:len(positions)], positions, errors
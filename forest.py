@@ -0,0 +1,196 @@
+import sys
+
+import numpy as np
+
+# Rows x trees evaluated per block; small enough for the node-index matrix and
+# its temporaries to stay in cache
+BLOCK_SIZE = 1 << 16
+
+
+class TreeEnsemble:
+    """A tree ensemble flattened into contiguous node arrays.
+
+    All trees share one set of arrays and roots holds the index of each tree's
+    root. Nodes are numbered so that the two children of a node are adjacent:
+    from node i the walk goes to child[i] + (x > threshold[i]). Leaves point to
+    themselves with an infinite threshold, so a batch can be walked level by level
+    with plain NumPy gathers and after `depth` steps every (row, tree) pair sits
+    on its leaf.
+
+    The prediction is `offset + scale * sum(leaf values)`, which covers both
+    random forests (scale = 1 / n_trees) and gradient boosting (scale =
+    learning_rate, offset = the initial estimate).
+    """
+
+    def __init__(self, feature, threshold, child, value, roots, depth, n_features,
+                 scale=1.0, offset=0.0):
+        self.feature = feature
+        self.threshold = threshold
+        self.child = child
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        self.n_features = int(n_features)
+        self.scale = float(scale)
+        self.offset = float(offset)
+
+    @classmethod
+    def from_trees(cls, trees, n_features, scale=1.0, offset=0.0):
+        """Flatten a list of fitted sklearn `Tree` objects (estimator.tree_)."""
+        feature, threshold, child, value, roots = [], [], [], [], []
+        start = 0
+
+        for tree in trees:
+            left, right = tree.children_left, tree.children_right
+
+            # Breadth-first renumbering that gives sibling nodes consecutive ids
+            order, first_child = [0], {}
+            for node in order:
+                if left[node] != -1:
+                    first_child[node] = len(order)
+                    order.extend((left[node], right[node]))
+
+            order = np.asarray(order, dtype=np.intp)
+            is_leaf = left[order] == -1
+            ids = np.arange(len(order), dtype=np.intp) + start
+            children = np.array([first_child.get(node, -1) for node in order], dtype=np.intp) + start
+
+            feature.append(np.where(is_leaf, 0, tree.feature[order]))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+            child.append(np.where(is_leaf, ids, children))
+            value.append(tree.value[order, 0, 0])
+            roots.append(start)
+            start += len(order)
+
+        return cls(
+            feature=np.concatenate(feature).astype(np.intp),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            child=np.concatenate(child).astype(np.intp),
+            value=np.concatenate(value).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            depth=max(tree.max_depth for tree in trees),
+            n_features=n_features,
+            scale=scale,
+            offset=offset,
+        )
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Build an ensemble from a fitted sklearn forest or gradient boosting regressor.
+
+        Raises TypeError for models that cannot be evaluated natively.
+        """
+        if getattr(model, 'n_outputs_', 1) != 1:
+            raise TypeError('Only single-output models are supported')
+
+        name = type(model).__name__
+        if name in ('RandomForestRegressor', 'ExtraTreesRegressor'):
+            trees = [estimator.tree_ for estimator in model.estimators_]
+            return cls.from_trees(trees, model.n_features_in_, scale=1.0 / len(trees))
+
+        if name == 'GradientBoostingRegressor':
+            if model.loss != 'squared_error':
+                raise TypeError(f"Unsupported GradientBoostingRegressor loss: {model.loss}")
+            if model.init_ == 'zero':
+                offset = 0.0
+            elif type(model.init_).__name__ == 'DummyRegressor':
+                offset = float(np.ravel(model.init_.constant_)[0])
+            else:
+                raise TypeError(f"Unsupported GradientBoostingRegressor init: {model.init_!r}")
+            trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+            return cls.from_trees(trees, model.n_features_in_, scale=model.learning_rate, offset=offset)
+
+        raise TypeError(f"Unsupported model type: {name}")
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def predict(self, X):
+        # sklearn compares float32 inputs against float64 thresholds; do the same
+        # so values that sit exactly on a threshold take the same branch
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input of shape (n, {self.n_features}), got {X.shape}")
+        # sklearn rejects these; NaN would otherwise quietly take the left branch
+        if not np.isfinite(X).all():
+            raise ValueError('Input X contains NaN or infinity')
+
+        out = np.empty(len(X), dtype=np.float64)
+        step = max(1, BLOCK_SIZE // self.n_trees)
+        for start in range(0, len(X), step):
+            out[start:start + step] = self._predict_block(X[start:start + step])
+        return out
+
+    def _predict_block(self, X):
+        flat = X.ravel()
+        row_offsets = (np.arange(len(X), dtype=np.intp) * self.n_features)[:, None]
+        node = np.repeat(self.roots[None, :], len(X), axis=0)
+
+        for _ in range(self.depth):
+            x = flat.take(row_offsets + self.feature.take(node))
+            node = self.child.take(node) + (x > self.threshold.take(node))
+
+        return self.offset + self.scale * self.value.take(node).sum(axis=1)
+
+
+def compile_model(model):
+    """Return a TreeEnsemble for model, or None if it has to be served by sklearn."""
+    try:
+        return TreeEnsemble.from_sklearn(model)
+    except (TypeError, AttributeError):
+        return None
+
+
+def _probe_inputs(ensemble, n_random=2000, seed=0):
+    """Inputs for comparing against sklearn: rows drawn from the split thresholds plus random rows.
+
+    Rows built from the thresholds themselves exercise the `<=` boundary, which is
+    where a float32/float64 mismatch would show up.
+    """
+    rng = np.random.default_rng(seed)
+    internal = np.isfinite(ensemble.threshold)
+    columns = []
+    for feature in range(ensemble.n_features):
+        values = ensemble.threshold[internal & (ensemble.feature == feature)].astype(np.float32)
+        if len(values) == 0:
+            values = np.zeros(1, dtype=np.float32)
+        columns.append(values)
+
+    n_rows = max(len(values) for values in columns)
+    at_threshold = np.column_stack([rng.choice(values, n_rows) for values in columns])
+    low = np.array([values.min() for values in columns])
+    high = np.array([values.max() for values in columns])
+    spread = np.maximum(high - low, 1.0)
+    random = rng.uniform(low - 0.1 * spread, high + 0.1 * spread, size=(n_random, len(columns)))
+    return np.vstack([at_threshold, random])
+
+
+def check_against_sklearn(path, rtol=1e-9, atol=1e-9):
+    """Compare TreeEnsemble.predict with the sklearn model stored in a pickle file."""
+    import pickle
+    import warnings
+
+    with open(path, 'rb') as file:
+        data = pickle.load(file)
+    model = data['model'] if isinstance(data, dict) else data
+
+    ensemble = TreeEnsemble.from_sklearn(model)
+    X = _probe_inputs(ensemble)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = model.predict(X)
+    actual = ensemble.predict(X)
+
+    max_error = float(np.max(np.abs(actual - expected)))
+    ok = np.allclose(actual, expected, rtol=rtol, atol=atol)
+    print(f"{path}: {type(model).__name__}, {ensemble.n_trees} trees, {len(X)} rows, "
+          f"max abs error {max_error:.3g} -> {'OK' if ok else 'MISMATCH'}")
+    return ok
+
+
+if __name__ == '__main__':
+    # Differential check: python forest.py car_price_model.pkl updated_model.pkl
+    paths = sys.argv[1:] or ['car_price_model.pkl', 'updated_model.pkl']
+    results = [check_against_sklearn(path) for path in paths]
+    sys.exit(0 if all(results) else 1)
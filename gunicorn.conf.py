@@ -0,0 +1,108 @@
+"""Gunicorn settings for CPU-bound tree-ensemble inference.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Every setting can be overridden from the environment:
+
+    WEB_CONCURRENCY        worker processes (default: CPUs // INFERENCE_THREADS)
+    INFERENCE_THREADS      cores one worker may use for inference (default 1)
+    GUNICORN_THREADS       request threads per worker; >1 switches to gthread (default 1)
+    GUNICORN_MAX_REQUESTS  recycle a worker after this many requests, +-10% jitter (default 5000)
+    PORT                   listen port (default 8000)
+    PROMETHEUS_MULTIPROC_DIR  where workers keep their metrics (default: a temp dir per master)
+    MODEL_GENERATION_FILE  reload marker shared by the workers (default: a temp file per master)
+
+Measured with benchmarks/bench_gunicorn.py: closed-loop /api/predict,
+updated_model.pkl, 16 clients, 10 s per setting, 1 vCPU sandbox (runs vary
+by about +-10%).
+
+    setting                                    req/s   p50 ms   p99 ms
+    old Procfile (sync x1, no preload)           909     17.1     24.9
+    sync x1, preload                             824     19.0     40.8
+    sync x2, preload                             822     19.8     25.0
+    gthread x1 t4, preload                       874     19.2     24.7
+    gthread x1 t4, micro-batching 2ms            905     17.2     38.1
+
+On one core every setting lands within the run-to-run noise: workers and
+threads only add throughput when there are cores for them, which is why the
+default is one worker per INFERENCE_THREADS cores. Preloading plus
+gc.freeze() keeps the model and the imported modules in pages shared by all
+workers.
+"""
+import gc
+import glob
+import os
+import shutil
+import tempfile
+
+# Cores each worker may use for inference; the rest of the budget goes to more workers
+inference_threads = max(1, int(os.getenv('INFERENCE_THREADS', '1')))
+
+# Keep OpenMP/BLAS pools inside the budget; this file runs before the app imports numpy
+for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+    os.environ.setdefault(var, str(inference_threads))
+
+# Every process writes its metrics to mmap'ed files here and /metrics adds them
+# up. Set before the app (and prometheus_client) is imported; files left over
+# from an earlier run would be counted again, so they are removed
+default_metrics_dir = os.path.join(tempfile.gettempdir(), f"carprice-metrics-{os.getpid()}")
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', default_metrics_dir)
+os.makedirs(metrics_dir, exist_ok=True)
+for path in glob.glob(os.path.join(metrics_dir, '*.db')):
+    os.remove(path)
+
+# /admin/reload writes a new generation here and every worker reloads its model
+default_generation_file = os.path.join(tempfile.gettempdir(), f"carprice-model-generation-{os.getpid()}")
+generation_file = os.environ.setdefault('MODEL_GENERATION_FILE', default_generation_file)
+
+cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', max(1, cpus // inference_threads)))
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Load the model once in the master; workers inherit it copy-on-write. The master
+# never serves requests, so the app's helper threads (model watcher, micro-batcher,
+# sampler, capture writer) only start in post_fork
+preload_app = True
+os.environ['START_THREADS_IN_POST_FORK'] = '1'
+
+# Recycle workers now and then so slow leaks can't accumulate; the jitter keeps
+# them from restarting all at once
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = max_requests // 10
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    # The app is loaded and no worker is forked yet: move everything allocated so
+    # far out of the collector's reach, so collections in the workers don't write
+    # to (and un-share) those pages
+    gc.collect()
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges (model version) from the aggregate
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    if metrics_dir == default_metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+    if generation_file == default_generation_file and os.path.exists(generation_file):
+        os.remove(generation_file)
+
+
+def post_fork(server, worker):
+    import app
+
+    app.start_background_threads()
+    # The worker starts accepting connections once this returns
+    app.warm_up.run()
@@ -0,0 +1,68 @@
+"""Prometheus metrics for the prediction service.
+
+With PROMETHEUS_MULTIPROC_DIR set (gunicorn.conf.py sets it), every process
+writes its samples to its own mmap'ed files in that directory and /metrics
+adds them up across all workers; a sample costs a few microseconds. Without
+it, the metrics live in the process that serves /metrics.
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+REQUESTS = Counter('carprice_requests_total', 'HTTP requests served', ['endpoint', 'method', 'status'])
+LATENCY = Histogram(
+    'carprice_request_duration_seconds', 'Time spent in the app per request', ['endpoint'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+ERRORS = Counter('carprice_errors_total', 'Requests that failed with an exception', ['endpoint', 'exception'])
+BATCH_SIZE = Histogram(
+    'carprice_batch_size', 'Records per batch prediction request',
+    buckets=tuple(2 ** k for k in range(15)),
+)
+CACHE_LOOKUPS = Counter('carprice_cache_lookups_total', 'Prediction cache lookups', ['result'])
+CAPTURE_DROPPED = Counter(
+    'carprice_capture_dropped_total', 'Captured requests dropped because the capture writer fell behind'
+)
+MODEL_INFO = Gauge(
+    'carprice_model_info', 'Model version served by live processes (1 = serving)', ['version', 'engine'],
+    multiprocess_mode='livemax',
+)
+
+_cache_hits = CACHE_LOOKUPS.labels('hit')
+_cache_misses = CACHE_LOOKUPS.labels('miss')
+
+
+def observe_request(endpoint, method, status, seconds):
+    endpoint = endpoint or 'unmatched'  # 404s; keeps raw paths out of the labels
+    REQUESTS.labels(endpoint, method, status).inc()
+    LATENCY.labels(endpoint).observe(seconds)
+
+
+def count_error(endpoint, exception):
+    ERRORS.labels(endpoint or 'unmatched', type(exception).__name__).inc()
+
+
+def count_cache_lookups(hits, misses):
+    if hits:
+        _cache_hits.inc(hits)
+    if misses:
+        _cache_misses.inc(misses)
+
+
+def set_model(bundle, previous=None):
+    if previous is not None:
+        MODEL_INFO.labels(previous.version, previous.status()['engine']).set(0)
+    if bundle is not None:
+        MODEL_INFO.labels(bundle.version, bundle.status()['engine']).set(1)
+
+
+def exposition():
+    """The text exposition of all metrics and its content type."""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,62 @@
+import gzip
+import hashlib
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # optional; pages are still served gzip-compressed without it
+    brotli = None
+
+# Clients and CDNs may store the pages but must revalidate them; a matching
+# If-None-Match is answered with an empty 304
+CACHE_CONTROL = 'public, no-cache'
+
+
+class StaticPage:
+    """A page rendered once and kept in memory in every encoding we serve.
+
+    Each encoding has its own strong ETag (the body hash plus an encoding
+    suffix), as required for different representations of the same resource.
+    """
+
+    def __init__(self, body, mimetype='text/html'):
+        self.mimetype = mimetype
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        self.variants = {
+            'identity': (body, digest),
+            'gzip': (gzip.compress(body, compresslevel=9, mtime=0), f"{digest}-gzip"),
+        }
+        if brotli is not None:
+            self.variants['br'] = (brotli.compress(body, quality=11), f"{digest}-br")
+
+    def negotiate(self, accept_encodings):
+        """Pick the smallest encoding the client accepts, preferring higher q-values."""
+        best, best_key = 'identity', None
+        for encoding, (body, _) in self.variants.items():
+            if encoding == 'identity':
+                continue
+            quality = accept_encodings[encoding]
+            if quality <= 0:
+                continue
+            key = (quality, -len(body))
+            if best_key is None or key > best_key:
+                best, best_key = encoding, key
+        return best
+
+    def response(self, request):
+        encoding = self.negotiate(request.accept_encodings)
+        body, etag = self.variants[encoding]
+
+        # If-None-Match always uses the weak comparison (RFC 9110 13.1.2)
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype=self.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        return response
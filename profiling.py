@@ -0,0 +1,314 @@
+"""Request profiling, written as collapsed stacks.
+
+Two profilers share the collapsed-stack output format:
+
+- RequestProfiles profiles single requests on demand, see below.
+- SamplingProfiler samples the stacks of requests in flight all the time,
+  at a low rate, and keeps per-endpoint counts over a rolling window.
+
+A profiled request runs its view under a deterministic stack profiler and
+the result is stored in PROFILE_DIR as `frame;frame;frame microseconds`
+lines, the input format of flamegraph.pl, speedscope and friends.
+
+To profile one request, send a signed X-Profile header:
+
+    python profiling.py sign /api/predict        # needs PROFILE_SECRET
+    curl -H "X-Profile: <value>" ...
+
+The response carries X-Profile-Id; GET /admin/profiles/<id> returns the stacks.
+"""
+import functools
+import glob
+import hashlib
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+from time import perf_counter
+
+from flask import make_response, request
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID = re.compile(r'^[\w.-]+\.folded$')
+
+
+def frame_name(code):
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def builtin_name(func):
+    # Methods of C types have no module but a qualified name such as ndarray.take
+    name = getattr(func, '__qualname__', func.__name__)
+    module = getattr(func, '__module__', None)
+    return f"{module}.{name}" if module else name
+
+
+def folded(stacks):
+    """Collapsed-stack text from {(frame, ...): seconds}, in microseconds."""
+    lines = [f"{';'.join(stack)} {round(seconds * 1e6)}" for stack, seconds in stacks.items()]
+    return '\n'.join(sorted(lines)) + '\n'
+
+
+class StackProfiler:
+    """Charges the wall time between profiler events to the current call stack.
+
+    It sees every Python and C call on the thread that runs it, so even a
+    one-millisecond request gets a complete profile. The profiler's own time
+    is left out of the totals but still slows the profiled code down.
+    """
+
+    def __init__(self):
+        self.stacks = {}
+        self._stack = []
+        self._last = 0.0
+
+    def _event(self, frame, event, arg):
+        now = perf_counter()
+        if self._stack:
+            key = tuple(self._stack)
+            self.stacks[key] = self.stacks.get(key, 0.0) + (now - self._last)
+        if event == 'call':
+            self._stack.append(frame_name(frame.f_code))
+        elif event == 'c_call':
+            self._stack.append(builtin_name(arg))
+        elif self._stack:  # return, c_return, c_exception
+            self._stack.pop()
+        self._last = perf_counter()
+
+    def run(self, func, *args, **kwargs):
+        self._stack = []
+        self._last = perf_counter()
+        sys.setprofile(self._event)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sys.setprofile(None)
+
+
+def sign(secret, path, expires):
+    message = f"{expires}:{path}".encode()
+    return f"{expires}:{hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()}"
+
+
+class RequestProfiles:
+    """Decides which requests to profile and keeps the results on disk.
+
+    A request is profiled when it carries an unexpired X-Profile signature
+    for its path, or while an admin has armed this process for the next few
+    requests. The directory can be shared by all workers of a node.
+    """
+
+    def __init__(self, directory, secret=None, keep=200):
+        self.directory = directory
+        self.secret = secret
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._armed = 0
+        self._saved = 0
+
+    def arm(self, count):
+        with self._lock:
+            self._armed = max(0, count)
+            return self._armed
+
+    def verify(self, value, path):
+        if not self.secret or not value:
+            return False
+        expires = value.split(':', 1)[0]
+        if not expires.isdigit() or int(expires) < time.time():
+            return False
+        return hmac.compare_digest(value, sign(self.secret, path, expires))
+
+    def wants(self, request):
+        if self.verify(request.headers.get(PROFILE_HEADER), request.path):
+            return True
+        if self._armed:
+            with self._lock:
+                if self._armed:
+                    self._armed -= 1
+                    return True
+        return False
+
+    def wrap(self, view):
+        """Return `view` profiled whenever wants() says so."""
+        @functools.wraps(view)
+        def profiled_view(*args, **kwargs):
+            if not self.wants(request):
+                return view(*args, **kwargs)
+            profiler = StackProfiler()
+            response = make_response(profiler.run(view, *args, **kwargs))
+            response.headers['X-Profile-Id'] = self.save(request.endpoint, profiler.stacks)
+            return response
+        return profiled_view
+
+    def save(self, endpoint, stacks):
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self._saved += 1
+            profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{self._saved}-{endpoint}.folded"
+        with open(os.path.join(self.directory, profile_id), 'w') as file:
+            file.write(folded(stacks))
+        self._prune()
+        return profile_id
+
+    def _prune(self):
+        profiles = self.list()
+        for profile_id in profiles[:-self.keep]:
+            try:
+                os.remove(os.path.join(self.directory, profile_id))
+            except OSError:
+                pass
+
+    def list(self):
+        """Stored profile ids, oldest first."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        # Ids start with a timestamp
+        return sorted(name for name in names if PROFILE_ID.match(name))
+
+    def read(self, profile_id):
+        if not PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, profile_id)) as file:
+                return file.read()
+        except OSError:
+            return None
+
+
+class SamplingProfiler:
+    """Always-on statistical profiler of the requests a process is serving.
+
+    Request threads register their endpoint while they run a request; a
+    background thread wakes `hz` times a second and counts the stack of every
+    registered thread. Counts are kept in `slice_seconds` slices and slices
+    older than `window` seconds are dropped. On every new slice the process
+    writes its window to `directory`, so any worker can report the whole node.
+    """
+
+    def __init__(self, directory, hz=20.0, window=300.0, slice_seconds=10.0):
+        self.directory = directory
+        self.interval = 1.0 / hz
+        self.window = window
+        self.slice_seconds = slice_seconds
+        self.active = {}
+        self._slices = []
+        self._lock = threading.Lock()
+        self._names = {}
+        self._thread = None
+
+    def start(self):
+        """Start the sampling thread; also restarts it in a process forked from this one."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        # A fork can happen while the parent's sampler holds the lock
+        self._lock = threading.Lock()
+        self.active = {}
+        self._slices = []
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def enter(self, endpoint):
+        self.active[threading.get_ident()] = endpoint or 'unmatched'
+
+    def leave(self):
+        self.active.pop(threading.get_ident(), None)
+
+    def _name(self, code):
+        name = self._names.get(code)
+        if name is None:
+            name = self._names[code] = frame_name(code)
+        return name
+
+    def _sample(self, counts):
+        frames = sys._current_frames()
+        for ident, endpoint in list(self.active.items()):
+            frame = frames.get(ident)
+            stack = []
+            while frame is not None:
+                stack.append(self._name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                key = (endpoint, ';'.join(reversed(stack)))
+                counts[key] = counts.get(key, 0) + 1
+
+    def _run(self):
+        while True:
+            started = time.time()
+            counts = {}
+            with self._lock:
+                self._slices.append((started, counts))
+                self._slices = [(t, c) for t, c in self._slices if t > started - self.window]
+            while time.time() < started + self.slice_seconds:
+                time.sleep(self.interval)
+                with self._lock:
+                    self._sample(counts)
+            try:
+                self._flush()
+            except OSError:
+                pass
+
+    def snapshot(self):
+        """This process's window as {endpoint: {stack: samples}}."""
+        merged = {}
+        with self._lock:
+            for _, counts in self._slices:
+                for (endpoint, stack), n in counts.items():
+                    stacks = merged.setdefault(endpoint, {})
+                    stacks[stack] = stacks.get(stack, 0) + n
+        return merged
+
+    def _flush(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"sampling-{os.getpid()}.json")
+        with open(f"{path}.tmp", 'w') as file:
+            json.dump({'updated': time.time(), 'endpoints': self.snapshot()}, file)
+        os.replace(f"{path}.tmp", path)
+
+    def collect(self):
+        """The window of every live process on the node, merged: (endpoints, pids).
+
+        This process contributes its current counts; other processes the
+        window they wrote at the start of their current slice.
+        """
+        merged = self.snapshot()
+        pids = [os.getpid()]
+        for path in glob.glob(os.path.join(self.directory, 'sampling-*.json')):
+            pid = int(re.search(r'sampling-(\d+)\.json$', path).group(1))
+            if pid == os.getpid():
+                continue
+            try:
+                os.kill(pid, 0)
+                with open(path) as file:
+                    data = json.load(file)
+            except ProcessLookupError:
+                # Left behind by a worker that has exited
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            except (OSError, ValueError):
+                continue
+            if data['updated'] < time.time() - self.window:
+                continue
+            pids.append(pid)
+            for endpoint, stacks in data['endpoints'].items():
+                target = merged.setdefault(endpoint, {})
+                for stack, n in stacks.items():
+                    target[stack] = target.get(stack, 0) + n
+        return merged, pids
+
+
+if __name__ == '__main__':
+    # python profiling.py sign PATH [TTL_SECONDS]
+    if len(sys.argv) < 3 or sys.argv[1] != 'sign' or not os.getenv('PROFILE_SECRET'):
+        sys.exit('usage: PROFILE_SECRET=... python profiling.py sign PATH [TTL_SECONDS]')
+    ttl = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+    print(sign(os.environ['PROFILE_SECRET'], sys.argv[2], int(time.time()) + ttl))
@@ -0,0 +1,195 @@
+"""Offline batch scoring of Data_Test.csv-style listing files.
+
+    python score.py INPUT OUTPUT [--model PATH] [--processes N] [--chunk-rows N]
+
+INPUT and OUTPUT are CSV files, or Parquet when the name ends in .parquet
+(needs pyarrow). Rows go through the same cleaning and FeatureEncoder as the
+API (bulk.score_rows), and OUTPUT is the input with predicted_price and error
+columns appended, in input order.
+
+The model is loaded once before the process pool forks, so the workers share
+the parent's pages; a MODEL_PATH that is an artifact directory (python
+artifact.py export) shares the memory-mapped node arrays through the page
+cache instead. The parent reads --chunk-rows rows at a time and keeps at most
+two chunks per worker in flight, so memory stays flat however long the input.
+"""
+import argparse
+import gc
+import math
+import multiprocessing
+import os
+import sys
+import time
+import warnings
+from collections import deque
+
+import bulk
+from bundle import load_bundle
+
+# As in app.py: the encoder hands the model plain NumPy rows
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+# The model scored by the pool workers; set in the parent before they fork
+_bundle = None
+
+
+def _score(header, rows):
+    return bulk.score_rows(_bundle, header, rows)
+
+
+def _text(value):
+    # Parquet columns are typed; give the encoder the strings a CSV would hold
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def read_csv(path, chunk_rows):
+    with open(path, 'rb') as file:
+        for header, rows in bulk.read_chunks(bulk.iter_lines(file), chunk_rows):
+            yield header, rows, None
+
+
+def read_parquet(path, chunk_rows):
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    header = parquet.schema_arrow.names
+    for batch in parquet.iter_batches(batch_size=chunk_rows):
+        columns = [column.to_pylist() for column in batch.columns]
+        yield header, [[_text(value) for value in values] for values in zip(*columns)], batch
+
+
+class CSVOutput:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.started = False
+
+    def write(self, header, rows, prices, errors, batch):
+        if not self.started:
+            self.file.write(bulk.csv_header(header))
+            self.started = True
+        self.file.write(bulk.csv_rows(header, rows, prices, errors))
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetOutput:
+    """Writes each chunk as a row group: the input columns plus the results.
+
+    Parquet input keeps its column types; CSV input is written as strings.
+    """
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.writer = None
+
+    def write(self, header, rows, prices, errors, batch):
+        pa = self.pa
+        if batch is None:
+            columns = [pa.array([row[i] if i < len(row) else None for row in rows], pa.string())
+                       for i in range(len(header))]
+            batch = pa.RecordBatch.from_arrays(columns, names=header)
+        table = pa.Table.from_batches([batch])
+        table = table.append_column('predicted_price', pa.array(prices, pa.float64()))
+        table = table.append_column('error', pa.array([errors.get(i) for i in range(len(rows))], pa.string()))
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def is_parquet(path):
+    return path.lower().endswith('.parquet')
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def score_file(source, output, processes):
+    """Score every chunk from `source` and write the results in input order.
+
+    Returns (rows, errors).
+    """
+    total = failed = 0
+
+    def write(header, rows, batch, result):
+        nonlocal total, failed
+        prices, errors = result
+        output.write(header, rows, prices, errors, batch)
+        total += len(rows)
+        failed += len(errors)
+
+    if processes == 1:
+        for header, rows, batch in source:
+            write(header, rows, batch, _score(header, rows))
+        return total, failed
+
+    # Objects allocated so far (the model above all) stay out of the collector, so
+    # the workers don't dirty the pages they share with this process
+    gc.collect()
+    gc.freeze()
+    pending = deque()
+    with multiprocessing.get_context('fork').Pool(processes) as pool:
+        for header, rows, batch in source:
+            pending.append((header, rows, batch, pool.apply_async(_score, (header, rows))))
+            if len(pending) >= 2 * processes:
+                header, rows, batch, result = pending.popleft()
+                write(header, rows, batch, result.get())
+        while pending:
+            header, rows, batch, result = pending.popleft()
+            write(header, rows, batch, result.get())
+    return total, failed
+
+
+def main():
+    global _bundle
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('input', help='CSV or .parquet file shaped like Data_Test.csv')
+    parser.add_argument('output', help='CSV or .parquet file to write')
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH', 'combined_model.pkl'),
+                        help='model pickle or artifact directory (default: MODEL_PATH)')
+    parser.add_argument('--processes', type=int, default=os.cpu_count(), help='worker processes (default: CPUs)')
+    parser.add_argument('--chunk-rows', type=int, default=10000, help='rows per chunk handed to a worker')
+    args = parser.parse_args()
+
+    if (is_parquet(args.input) or is_parquet(args.output)) and not _has_pyarrow():
+        sys.exit('Parquet files need pyarrow (pip install pyarrow)')
+
+    _bundle = load_bundle(args.model)
+    processes = max(1, args.processes)
+    source = (read_parquet if is_parquet(args.input) else read_csv)(args.input, args.chunk_rows)
+    output = (ParquetOutput if is_parquet(args.output) else CSVOutput)(args.output)
+
+    started = time.perf_counter()
+    try:
+        rows, errors = score_file(source, output, processes)
+    finally:
+        output.close()
+    seconds = time.perf_counter() - started
+
+    # Processes beyond the CPU count only take turns on the same cores
+    cores = min(processes, os.cpu_count() or processes)
+    rate = rows / seconds if seconds > 0 else 0.0
+    print(f"{rows} rows ({errors} errors) in {seconds:.2f}s with {processes} processes: "
+          f"{rate:.0f} rows/s, {rate / cores:.0f} rows/s per core", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
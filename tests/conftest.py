@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+# The app reads its configuration at import time
+os.environ.setdefault('MODEL_PATH', os.path.join(ROOT, 'updated_model.pkl'))
+os.environ.setdefault('SAMPLING_HZ', '0')
+os.environ.setdefault('WARMUP_REQUESTS', '8')
+
+
+@pytest.fixture(scope='session')
+def service():
+    os.chdir(ROOT)
+    import app
+
+    return app
+
+
+@pytest.fixture
+def client(service):
+    return service.app.test_client()
+
+
+def pytest_configure(config):
+    # As in app.py: the encoder hands the model plain NumPy rows
+    config.addinivalue_line('filterwarnings', 'ignore:X does not have valid feature names')
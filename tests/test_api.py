@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from cache import PredictionCache
+
+RECORD = {
+    'Year': 2015, 'Kilometers_Driven': 41000, 'Engine': 1582, 'Power': 126.2, 'Seats': 5,
+    'Location': 'Pune', 'Fuel_Type': 'Diesel', 'Transmission': 'Manual', 'Owner_Type': 'First'
+}
+OTHER = dict(RECORD, Year=2011, Kilometers_Driven=90000, Fuel_Type='Petrol')
+
+
+def predict(client, **kwargs):
+    response = client.post('/api/predict', **kwargs)
+    return response.status_code, response.get_json()
+
+
+def test_single_record(client):
+    status, body = predict(client, json=RECORD)
+    assert status == 200
+    assert body['status'] == 'success'
+    assert body['predicted_price'] > 0
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_batch_matches_single_predictions(client, service, monkeypatch, cached):
+    cache = PredictionCache(100) if cached else None
+    monkeypatch.setattr(service, 'cache', cache)
+    singles = [predict(client, json=record)[1]['predicted_price'] for record in (RECORD, OTHER)]
+
+    status, body = predict(client, json=[RECORD, OTHER, RECORD])
+    assert status == 200
+    assert (body['count'], body['errors']) == (3, 0)
+    assert [result['index'] for result in body['results']] == [0, 1, 2]
+    prices = [result['predicted_price'] for result in body['results']]
+    assert prices == pytest.approx(singles + singles[:1])
+    if cached:
+        # The single requests filled the cache, so the whole batch is served from it
+        assert cache.stats()['hits'] == 3
+
+
+def test_bad_rows_are_reported_in_place(client):
+    status, body = predict(client, json=[RECORD, dict(RECORD, Location='Atlantis'), dict(RECORD, Power='nan')])
+    assert status == 200
+    assert body['errors'] == 2
+    assert [result['status'] for result in body['results']] == ['success', 'error', 'error']
+
+
+def test_ndjson_batch_keeps_unparsable_lines(client):
+    lines = [json.dumps(RECORD), '{not json', '', json.dumps(OTHER)]
+    status, body = predict(client, data='\n'.join(lines), content_type='application/x-ndjson')
+    assert status == 200
+    assert body['count'] == 3
+    assert body['results'][1]['error'].startswith('Invalid JSON')
+    assert body['results'][2]['status'] == 'success'
+
+
+def test_batch_over_the_limit(client, service, monkeypatch):
+    monkeypatch.setattr(service, 'MAX_BATCH_SIZE', 2)
+    status, body = predict(client, json=[RECORD] * 3)
+    assert status == 413
+    assert body['status'] == 'error'
+
+
+def test_invalid_single_record(client):
+    status, body = predict(client, json=dict(RECORD, Year='soon'))
+    assert status == 400
+    assert body['status'] == 'error'
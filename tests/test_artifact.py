@@ -0,0 +1,74 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from artifact import export_artifact, is_artifact, load_artifact, read_pickle_bundle
+from forest import TreeEnsemble
+
+
+@pytest.fixture(scope='module')
+def exported():
+    model, feature_names, label_encoders, numerical_cols, categorical_cols = read_pickle_bundle('updated_model.pkl')
+    categories = {feature: le.classes_.tolist() for feature, le in label_encoders.items()}
+    engine = TreeEnsemble.from_sklearn(model)
+    return lambda path: export_artifact(path, engine, feature_names, categories, numerical_cols, categorical_cols)
+
+
+def siblings(tmp_path):
+    return sorted(name for name in os.listdir(tmp_path) if name != 'model')
+
+
+def test_re_export_switches_the_link_and_removes_the_old_copy(tmp_path, exported):
+    path = str(tmp_path / 'model')
+    version = exported(path)
+    first = os.path.realpath(path)
+    assert os.path.islink(path)
+    assert load_artifact(path).version == version
+
+    assert exported(path) == version
+    assert os.path.realpath(path) != first
+    assert siblings(tmp_path) == [os.path.basename(os.path.realpath(path))]
+
+
+def test_plain_directory_from_an_older_export_is_replaced(tmp_path, exported):
+    path = tmp_path / 'model'
+    path.mkdir()
+    (path / 'manifest.json').write_text('{}')
+    exported(str(path))
+    assert os.path.islink(path)
+    assert len(siblings(tmp_path)) == 1
+
+
+def test_path_stays_loadable_during_concurrent_exports(tmp_path, exported):
+    path = str(tmp_path / 'model')
+    version = exported(path)
+    failures = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            try:
+                artifact = load_artifact(path)
+                assert artifact.version == version
+                assert np.asarray(artifact.engine.value).size
+            except Exception as e:
+                failures.append(e)
+
+    def write():
+        for _ in range(10):
+            exported(path)
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    writers = [threading.Thread(target=write) for _ in range(2)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    assert failures == []
+    assert is_artifact(path)
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+VIDEO = 'landing_video.mp4'
+
+
+@pytest.fixture
+def video(service):
+    manifest = service.app.extensions['assets']
+    with open(os.path.join(service.app.static_folder, VIDEO), 'rb') as file:
+        data = file.read()
+    return f"/assets/{manifest.hashed[VIDEO]}", data, manifest.files[manifest.hashed[VIDEO]][1]
+
+
+def test_whole_file(client, video):
+    url, data, digest = video
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data == data
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['ETag'] == f'"{digest}"'
+    assert 'immutable' in response.headers['Cache-Control']
+
+
+@pytest.mark.parametrize('header, start, stop', [
+    ('bytes=0-99', 0, 100),
+    ('bytes=100-', 100, None),
+    ('bytes=-50', -50, None),
+])
+def test_single_range(client, video, header, start, stop):
+    url, data, digest = video
+    response = client.get(url, headers={'Range': header})
+    assert response.status_code == 206
+    assert response.data == data[start:stop]
+    first = start % len(data)
+    assert response.headers['Content-Range'] == f"bytes {first}-{first + len(response.data) - 1}/{len(data)}"
+    assert response.content_length == len(response.data)
+
+
+def test_unsatisfiable_range(client, video):
+    url, data, digest = video
+    response = client.get(url, headers={'Range': f"bytes={len(data)}-"})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f"bytes */{len(data)}"
+
+
+@pytest.mark.parametrize('headers', [
+    {'Range': 'bytes=0-9', 'If-Range': '"stale"'},
+    {'Range': 'bytes=0-9', 'If-Range': 'Wed, 21 Oct 2015 07:28:00 GMT'},
+    {'Range': 'bytes=0-9,20-29'},
+])
+def test_range_ignored(client, video, headers):
+    url, data, digest = video
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.data == data
+
+
+def test_if_range_with_current_etag(client, video):
+    url, data, digest = video
+    response = client.get(url, headers={'Range': 'bytes=0-9', 'If-Range': f'"{digest}"'})
+    assert response.status_code == 206
+    assert response.data == data[:10]
+
+
+def test_not_modified(client, video):
+    url, data, digest = video
+    response = client.get(url, headers={'If-None-Match': f'"{digest}"'})
+    assert response.status_code == 304
+    assert response.data == b''
+
+
+def test_unknown_asset(client):
+    assert client.get('/assets/nope.0123456789.mp4').status_code == 404
@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+
+import pytest
+
+import bulk
+
+with open('Data_Test.csv', 'rb') as _file:
+    DATA_TEST = _file.read()
+HEADER, *ROWS = DATA_TEST.splitlines(keepends=True)
+
+
+def post_csv(client, body, query='', **kwargs):
+    return client.post(f"/api/predict/csv{query}", data=body, content_type='text/csv', **kwargs)
+
+
+def read_csv(response):
+    return list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+
+
+def latin1_row():
+    row = ROWS[0].decode().replace('Maruti Alto', 'Citroën C3')
+    return row.encode('latin-1')
+
+
+def test_scores_every_row_like_the_batch_api(client):
+    response = post_csv(client, DATA_TEST)
+    assert response.status_code == 200
+    rows = read_csv(response)
+    assert rows[0][-2:] == ['predicted_price', 'error']
+    assert len(rows) == 1 + len(ROWS)
+
+    record = bulk.record_from_csv_row(dict(zip(rows[0], rows[1])))
+    expected = client.post('/api/predict', json=[record]).get_json()['results'][0]['predicted_price']
+    assert float(rows[1][-2]) == pytest.approx(expected)
+
+
+def test_multipart_upload_and_ndjson(client):
+    response = client.post('/api/predict/csv?format=ndjson', data={'file': (io.BytesIO(DATA_TEST), 'inventory.csv')})
+    assert response.mimetype == 'application/x-ndjson'
+    results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [result['index'] for result in results] == list(range(len(ROWS)))
+    assert all(result['status'] == 'success' for result in results)
+
+
+@pytest.mark.parametrize('position', [0, 1200])
+def test_non_utf8_row_is_a_row_error(client, position):
+    rows = list(ROWS)
+    rows[position] = latin1_row()
+    response = post_csv(client, HEADER + b''.join(rows))
+    assert response.status_code == 200
+    out = read_csv(response)[1:]
+    assert len(out) == len(ROWS)
+    assert out[position][-1] == 'Row is not valid UTF-8'
+    assert 'Citro�n' in out[position][0]
+    assert all(row[-1] == '' for i, row in enumerate(out) if i != position)
+
+
+@pytest.mark.parametrize('body', [b'', b'Name,Year\n', b'x' * (bulk.MAX_LINE_LENGTH + 10)])
+def test_unusable_file_is_a_400(client, body):
+    response = post_csv(client, body)
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+
+
+@pytest.mark.parametrize('query', ['', '?format=ndjson'])
+def test_mid_stream_failure_is_marked_and_aborts(client, service, monkeypatch, query):
+    monkeypatch.setattr(service, 'BULK_CHUNK_ROWS', 100)
+    score_rows = bulk.score_rows
+    calls = []
+
+    def failing_score_rows(bundle, header, rows):
+        calls.append(len(rows))
+        if len(calls) == 3:
+            raise RuntimeError('model exploded')
+        return score_rows(bundle, header, rows)
+
+    monkeypatch.setattr(bulk, 'score_rows', failing_score_rows)
+    response = post_csv(client, DATA_TEST, query, buffered=False)
+    assert response.status_code == 200
+
+    body = []
+    with pytest.raises(RuntimeError):
+        for chunk in response.response:
+            body.append(chunk)
+    last = b''.join(body).decode().splitlines()[-1]
+    assert 'Scoring stopped after 200 rows: model exploded' in last
+
+
+def test_iter_lines_drops_bom_and_keeps_lines_across_blocks():
+    stream = io.BytesIO(b'\xef\xbb\xbfa,b\r\n1,2\n3,4')
+    assert list(bulk.iter_lines(stream, block_size=2)) == ['a,b\r\n', '1,2\n', '3,4']
+
+
+def test_ragged_rows_keep_results_in_their_columns(client):
+    header = HEADER.decode().rstrip('\r\n').split(',')
+    short = ','.join(next(csv.reader([ROWS[0].decode()]))[:7]) + '\n'
+    long = ROWS[1].decode().rstrip('\r\n') + ',extra,cells\n'
+    response = post_csv(client, HEADER + short.encode() + long.encode())
+    assert response.status_code == 200
+    rows = read_csv(response)
+    assert all(len(row) == len(header) + 2 for row in rows)
+    short_out = dict(zip(rows[0], rows[1]))
+    assert short_out['Mileage'] == ''
+    assert short_out['predicted_price'] != '' or short_out['error'] != ''
+    assert float(rows[2][-2]) > 0
+
+
+def test_score_py_pads_short_rows(service, tmp_path):
+    import score
+
+    source = tmp_path / 'short.csv'
+    source.write_bytes(HEADER + b','.join(ROWS[0].split(b',')[:7]) + b'\n')
+    output = score.CSVOutput(str(tmp_path / 'out.csv'))
+    score._bundle = service.bundles.current
+    try:
+        score.score_file(score.read_csv(str(source), 10), output, 1)
+    finally:
+        output.close()
+        score._bundle = None
+    rows = list(csv.reader(open(tmp_path / 'out.csv', newline='')))
+    out = dict(zip(rows[0], rows[1]))
+    assert out['Mileage'] == ''
+    assert len(rows[1]) == len(rows[0])
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from cache import PredictionCache, SharedPredictionCache, TieredCache, row_key
+
+
+def test_row_key_folds_negative_zero():
+    assert row_key(np.array([-0.0, 1.0])) == row_key(np.array([0.0, 1.0]))
+
+
+def test_lru_evicts_least_recently_used():
+    cache = PredictionCache(maxsize=2)
+    cache.put('v1', b'a', 1.0)
+    cache.put('v1', b'b', 2.0)
+    assert cache.get('v1', b'a') == 1.0
+    cache.put('v1', b'c', 3.0)
+    assert cache.get('v1', b'b') is None
+    assert cache.get('v1', b'a') == 1.0
+    assert cache.stats()['evictions'] == 1
+
+
+def test_new_model_version_invalidates():
+    cache = PredictionCache()
+    cache.put('v1', b'a', 1.0)
+    assert cache.get('v2', b'a') is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_ttl_expires_entries():
+    cache = PredictionCache(ttl=0.05)
+    cache.put('v1', b'a', 1.0)
+    time.sleep(0.1)
+    assert cache.get('v1', b'a') is None
+    assert cache.stats()['expirations'] == 1
+
+
+@pytest.fixture
+def shared(tmp_path):
+    return SharedPredictionCache(str(tmp_path / 'cache.sqlite'), maxsize=10, ttl=0.3, prune_every=5)
+
+
+def test_shared_cache_round_trip_and_versioned_keys(shared):
+    shared.put('v1', b'a', 1.5)
+    assert shared.get('v1', b'a') == 1.5
+    assert shared.get('v2', b'a') is None
+    stats = shared.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+
+
+def test_shared_cache_prunes_to_maxsize(shared):
+    for i in range(20):
+        shared.put('v1', bytes([i]), float(i))
+    assert shared.stats()['size'] <= shared.maxsize
+
+
+def test_tiered_copy_keeps_the_shared_expiry(shared):
+    shared.put('v1', b'a', 1.0)
+    time.sleep(0.2)
+    tiered = TieredCache(PredictionCache(ttl=0.3), shared)
+    assert tiered.get('v1', b'a') == 1.0
+    time.sleep(0.15)
+    # 0.35 s after the shared put: expired in both tiers, not alive for another 0.3 s
+    assert tiered.get('v1', b'a') is None
+
+
+def test_shared_counters_are_exact_across_threads(shared):
+    shared.put('v1', b'a', 1.0)
+    threads = [threading.Thread(target=lambda: [shared.get('v1', key) for key in (b'a', b'b') * 200])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = shared.stats()
+    assert stats['hits'] + stats['misses'] + stats['errors'] == 8 * 400
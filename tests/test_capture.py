@@ -0,0 +1,27 @@
+import json
+import threading
+
+from capture import RequestCapture
+
+
+def test_counters_are_exact_across_threads(tmp_path):
+    capture = RequestCapture(str(tmp_path), queue_size=10, flush_interval=0.01)
+    capture.start()
+
+    def submit():
+        for i in range(500):
+            capture.submit({'input': {'Year': i, 'Secret': 'x'}}, ['Year'])
+
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    capture.close()
+
+    stats = capture.stats()
+    assert stats['captured'] + stats['dropped'] == 8 * 500
+    assert stats['written'] == stats['captured']
+    lines = [json.loads(line) for path in tmp_path.glob('requests-*.jsonl') for line in open(path)]
+    assert len(lines) == stats['written']
+    assert all(set(line['input']) == {'Year'} for line in lines)
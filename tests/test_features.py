@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from features import FeatureEncoder, record_from_csv_row
+
+FEATURES = ['Location', 'Fuel_Type', 'Year', 'Power', 'Seats']
+CATEGORIES = {'Location': ['Delhi', 'Pune'], 'Fuel_Type': ['Diesel', 'Petrol']}
+
+RECORD = {
+    'Year': 2015, 'Kilometers_Driven': 41000, 'Engine': 1582, 'Power': 126.2, 'Seats': 5,
+    'Location': 'Pune', 'Fuel_Type': 'Diesel', 'Transmission': 'Manual', 'Owner_Type': 'First'
+}
+
+
+@pytest.fixture
+def encoder():
+    return FeatureEncoder(FEATURES, CATEGORIES)
+
+
+def test_encode_orders_features_and_codes_categories(encoder):
+    row = encoder.encode({'Year': '2015', 'Power': '126.2', 'Seats': 5, 'Location': 'Pune', 'Fuel_Type': 'Diesel'})
+    assert row.tolist() == [[1.0, 0.0, 2015.0, 126.2, 5.0]]
+
+
+def test_missing_fields_encode_as_zero(encoder):
+    assert encoder.encode({}).tolist() == [[0.0] * len(FEATURES)]
+
+
+@pytest.mark.parametrize('value', ['nan', 'NaN', 'inf', '-Infinity', float('nan'), float('inf')])
+def test_non_finite_numbers_are_rejected(encoder, value):
+    with pytest.raises(ValueError):
+        encoder.encode({'Power': value})
+
+
+def test_encode_many_reports_errors_per_row(encoder):
+    matrix, positions, errors = encoder.encode_many([
+        {'Power': 100}, {'Power': 'nan'}, {'Location': 'Mars'}, 'not a record', {'Seats': '4'}
+    ])
+    assert positions == [0, 4]
+    assert sorted(errors) == [1, 2, 3]
+    assert np.isfinite(matrix).all()
+    assert matrix[:, FEATURES.index('Seats')].tolist() == [0.0, 4.0]
+
+
+def test_record_from_csv_row_maps_aliases_and_drops_missing():
+    record = record_from_csv_row({'Kilometers Driven': ' 41000 ', 'Power (bhp)': 'null', 'Location': 'Pune'})
+    assert record == {'Kilometers_Driven': '41000', 'Location': 'Pune'}
+
+
+@pytest.mark.parametrize('size', [1, 11, 41])
+def test_batch_with_non_finite_row_fails_only_that_row(client, size):
+    records = [dict(RECORD) for _ in range(size)]
+    records[-1]['Power'] = 'nan'
+    response = client.post('/api/predict', json=records)
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['status'] for result in results] == ['success'] * (size - 1) + ['error']
@@ -0,0 +1,51 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from forest import TreeEnsemble, _probe_inputs, compile_model
+
+PICKLES = ['car_price_model.pkl', 'updated_model.pkl']
+
+
+def load_model(path):
+    with open(path, 'rb') as file:
+        data = pickle.load(file)
+    return data['model'] if isinstance(data, dict) else data
+
+
+@pytest.fixture(scope='module', params=PICKLES)
+def model(request):
+    return load_model(request.param)
+
+
+def test_matches_sklearn_including_threshold_rows(model):
+    ensemble = TreeEnsemble.from_sklearn(model)
+    # The first rows of the probe sit exactly on split thresholds
+    X = _probe_inputs(ensemble)
+    np.testing.assert_allclose(ensemble.predict(X), model.predict(X), rtol=1e-9, atol=1e-9)
+
+
+def test_matches_sklearn_across_blocks(model):
+    ensemble = TreeEnsemble.from_sklearn(model)
+    X = np.resize(_probe_inputs(ensemble, n_random=0), (3 * (1 << 16) // ensemble.n_trees + 7, ensemble.n_features))
+    np.testing.assert_allclose(ensemble.predict(X), model.predict(X), rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize('value', [np.nan, np.inf, -np.inf])
+def test_rejects_non_finite_input(model, value):
+    ensemble = TreeEnsemble.from_sklearn(model)
+    X = np.zeros((2, ensemble.n_features))
+    X[1, 0] = value
+    with pytest.raises(ValueError):
+        ensemble.predict(X)
+
+
+def test_rejects_wrong_shape(model):
+    ensemble = TreeEnsemble.from_sklearn(model)
+    with pytest.raises(ValueError):
+        ensemble.predict(np.zeros((1, ensemble.n_features + 1)))
+
+
+def test_unsupported_models_fall_back_to_sklearn():
+    assert compile_model(object()) is None
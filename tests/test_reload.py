@@ -0,0 +1,44 @@
+import time
+
+from bundle import BundleHolder
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_generation_file_reloads_every_watching_holder(tmp_path):
+    generation_file = str(tmp_path / 'generation')
+    holders = [BundleHolder('updated_model.pkl', generation_file) for _ in range(2)]
+    for holder in holders:
+        holder.reload()
+        holder.watch(0.05, watch_path=False)
+
+    generation = holders[0].request_reload()
+
+    assert wait_for(lambda: all(holder.reloads == 2 for holder in holders))
+    assert all(holder.generation == generation for holder in holders)
+
+
+def test_reload_without_generation_file_runs_in_the_background():
+    holder = BundleHolder('updated_model.pkl')
+    holder.reload()
+
+    assert holder.request_reload() is None
+    assert wait_for(lambda: holder.reloads == 2)
+
+
+def test_admin_reload_is_accepted(service, client, monkeypatch):
+    monkeypatch.setattr(service, 'ADMIN_TOKEN', 'secret')
+    assert client.post('/admin/reload').status_code == 403
+
+    reloads = service.bundles.reloads
+    response = client.post('/admin/reload', headers={'X-Admin-Token': 'secret'})
+    assert response.status_code == 202
+    assert response.get_json()['status'] == 'accepted'
+    assert wait_for(lambda: service.bundles.reloads == reloads + 1)
@@ -0,0 +1,16 @@
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def test_template_bytecode_cache_is_written(tmp_path):
+    # The app reads TEMPLATE_CACHE_DIR at import time, so import it afresh
+    env = dict(os.environ, TEMPLATE_CACHE_DIR=str(tmp_path), MODEL_PATH='updated_model.pkl',
+               SAMPLING_HZ='0', WARMUP_REQUESTS='0')
+    code = 'import app; print(type(app.app.jinja_env.bytecode_cache).__name__)'
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-1] == 'FileSystemBytecodeCache'
+    assert len(list(tmp_path.glob('__jinja2_*.cache'))) >= 3
@@ -0,0 +1,55 @@
+import os
+
+from cache import PredictionCache
+from warmup import WarmUp, sample_records
+
+
+def test_ready_after_successful_warm_up(service):
+    warm_up = WarmUp(service.app, sample_records('Data_Train.csv', 4))
+    assert not warm_up.ready
+    warm_up.run()
+    assert warm_up.ready
+    assert warm_up.status()['ready'] is True
+
+
+def test_server_errors_keep_warm_up_unready(service, monkeypatch):
+    monkeypatch.setattr(service.bundles, 'current', None)
+    warm_up = WarmUp(service.app, sample_records('Data_Train.csv', 4))
+    warm_up.run()
+    assert warm_up.pid == os.getpid()
+    assert warm_up.errors == 5
+    assert not warm_up.ready
+
+
+def test_rejected_sample_rows_dont_block_readiness(service):
+    warm_up = WarmUp(service.app, [{'Location': 'Nowhere'}] + sample_records('Data_Train.csv', 2))
+    warm_up.run()
+    assert (warm_up.errors, warm_up.rejected) == (0, 1)
+    assert warm_up.ready
+
+
+def test_installing_a_model_warms_up_again(service, monkeypatch):
+    warm_up = WarmUp(service.app, sample_records('Data_Train.csv', 4))
+    monkeypatch.setattr(service, 'warm_up', warm_up)
+    # A worker that started before the model existed
+    monkeypatch.setattr(service.bundles, 'current', None)
+    warm_up.run()
+    assert not warm_up.ready
+
+    service.bundles.reload()
+    assert warm_up.ready
+    assert service.app.test_client().get('/readyz').status_code == 200
+
+
+def test_warm_up_leaves_the_cache_alone(service, monkeypatch):
+    cache = PredictionCache(100)
+    monkeypatch.setattr(service, 'cache', cache)
+    WarmUp(service.app, sample_records('Data_Train.csv', 8)).run()
+    stats = cache.stats()
+    assert (stats['size'], stats['hits'], stats['misses']) == (0, 0, 0)
+
+
+def test_readyz_reports_warm_up(client, service):
+    response = client.get('/readyz')
+    assert response.status_code == (200 if service.warm_up.ready else 503)
+    assert response.get_json()['warm_up']['errors'] == service.warm_up.errors
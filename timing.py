@@ -0,0 +1,77 @@
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+# Histogram bucket upper bounds in ms: 10us doubling up to ~5s
+BUCKETS_MS = tuple(0.01 * 2 ** k for k in range(20))
+
+
+class StageTimer:
+    """Splits one request's time into named stages.
+
+    Each mark() charges the time since the previous mark to a stage; marking
+    the same stage twice adds up.
+    """
+    __slots__ = ('stages', '_last')
+
+    def __init__(self):
+        self.stages = {}
+        self._last = perf_counter()
+
+    def mark(self, stage):
+        now = perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last)
+        self._last = now
+
+    def header(self):
+        """Server-Timing header value, durations in milliseconds."""
+        metrics = [f"{stage};dur={seconds * 1e3:.3f}" for stage, seconds in self.stages.items()]
+        metrics.append(f"total;dur={sum(self.stages.values()) * 1e3:.3f}")
+        return ', '.join(metrics)
+
+
+class _NullTimer:
+    """Stands in for StageTimer when timing is off; mark() does nothing."""
+    __slots__ = ()
+
+    def mark(self, stage):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class StageHistograms:
+    """Per-endpoint, per-stage latency histograms of finished requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def record(self, endpoint, timer):
+        with self._lock:
+            for stage, seconds in timer.stages.items():
+                key = (endpoint, stage)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = [[0] * (len(BUCKETS_MS) + 1), 0, 0.0, 0.0]
+                ms = seconds * 1e3
+                histogram[0][bisect_left(BUCKETS_MS, ms)] += 1
+                histogram[1] += 1
+                histogram[2] += ms
+                histogram[3] = max(histogram[3], ms)
+
+    def stats(self):
+        result = {}
+        with self._lock:
+            for (endpoint, stage), (counts, count, total, peak) in self._histograms.items():
+                buckets = {f"{bound:g}": n for bound, n in zip(BUCKETS_MS, counts) if n}
+                if counts[-1]:
+                    buckets['+Inf'] = counts[-1]
+                result.setdefault(endpoint, {})[stage] = {
+                    'count': count,
+                    'mean_ms': total / count,
+                    'max_ms': peak,
+                    'buckets_ms': buckets,
+                }
+        return result
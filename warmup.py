@@ -0,0 +1,89 @@
+import csv
+import logging
+import os
+import time
+
+from features import record_from_csv_row
+
+# Set in the WSGI environ of warm-up requests so request metrics can skip them
+WARMUP_ENVIRON_KEY = 'carprice.warm_up'
+
+
+def sample_records(path, count):
+    """Return `count` records spread evenly over a Data_Train.csv-style file."""
+    with open(path, newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        rows = list(reader)
+    if count <= 0 or not rows:
+        return []
+    # Only the sampled rows are turned into records; this runs on every start
+    step = max(1, len(rows) // count)
+    return [record_from_csv_row(dict(zip(header, row))) for row in rows[::step][:count]]
+
+
+class WarmUp:
+    """Sends representative requests through the app before a worker takes traffic.
+
+    The requests go through the Flask test client, so routing, JSON parsing,
+    encoding, the micro-batcher and the model all run exactly as they do for
+    real traffic; only the prediction caches are left alone. Warm-up is per
+    process: a worker forked from a warmed-up master is not ready until it has
+    warmed up itself, and not while its last warm-up had server errors. The app
+    runs it again whenever a model is installed, so a worker that started
+    without one becomes ready once a reload brings it in. A sample row the model
+    rejects (a 4xx) is the data's fault, not the process's, and only counted.
+    """
+
+    def __init__(self, app, records, batch_size=32):
+        self.app = app
+        self.records = records
+        self.batch_size = batch_size
+        self.pid = None
+        self.seconds = None
+        self.errors = 0
+        self.rejected = 0
+
+    @property
+    def ready(self):
+        # A process whose warm-up requests hit server errors can't serve them either
+        return self.pid == os.getpid() and self.errors == 0
+
+    def run(self):
+        started = time.perf_counter()
+        errors = rejected = 0
+        client = self.app.test_client()
+        client.environ_base[WARMUP_ENVIRON_KEY] = True
+
+        # One request per record, then one batch request for the batch code path
+        bodies = list(self.records)
+        if self.records:
+            bodies.append(self.records[:self.batch_size])
+
+        for body in bodies:
+            try:
+                status = client.post('/api/predict', json=body).status_code
+            except Exception as e:
+                logging.error(f"Error in warm-up request: {str(e)}")
+                status = 500
+            errors += status >= 500
+            rejected += 400 <= status < 500
+
+        self.seconds = time.perf_counter() - started
+        self.errors = errors
+        self.rejected = rejected
+        self.pid = os.getpid()
+        if errors:
+            logging.warning(f"Warm-up finished with {errors} failed requests")
+        if rejected:
+            logging.warning(f"Warm-up: {rejected} sample requests were rejected as invalid")
+        logging.info(f"Warm-up: {len(bodies)} requests in {self.seconds:.3f}s (pid {self.pid})")
+
+    def status(self):
+        return {
+            'ready': self.ready,
+            'requests': len(self.records),
+            'seconds': round(self.seconds, 4) if self.seconds is not None else None,
+            'errors': self.errors,
+            'rejected': self.rejected,
+        }